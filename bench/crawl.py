@@ -0,0 +1,185 @@
+"""Measure crawl performance of :class:`~aioqzone_feed.api.FeedApi` against :mod:`mock_qzone`.
+
+Each round runs a fresh api on the same mock server and records:
+
+- time to the first :obj:`~aioqzone_feed.api.FeedApi.feed_processed` callback,
+- time until :meth:`~aioqzone_feed.api.FeedApi.wait` returns,
+- feeds per second, and requests sent to the server,
+- the longest time the event loop is blocked during the crawl.
+
+Usage::
+
+    python bench/crawl.py --feeds 500 --page-size 10 --hasmore 0.2 --latency 0.05
+    python bench/crawl.py --mode second --replay recorded_feeds.json
+    python bench/crawl.py --mode heartbeat --rounds 50
+    python bench/crawl.py --feeds 2000 --page-size 50 --offload process
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+import typing as t
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from aiohttp import ClientSession
+from mock_qzone import MockQzone
+
+from aioqzone_feed.api import FeedApi
+from aioqzone_feed.utils import Metrics
+
+
+def percentile(data: t.Sequence[float], p: float) -> float:
+    data = sorted(data)
+    return data[min(len(data) - 1, int(round(p / 100 * (len(data) - 1))))]
+
+
+def summarize(name: str, data: t.Sequence[float], unit: str = "ms", scale: float = 1e3):
+    if not data:
+        return
+    print(
+        f"{name:<22} p50={percentile(data, 50) * scale:9.2f}{unit}  "
+        f"p99={percentile(data, 99) * scale:9.2f}{unit}  "
+        f"mean={sum(data) / len(data) * scale:9.2f}{unit}"
+    )
+
+
+class StallWatcher:
+    """Record the longest time the event loop is blocked, by sleeping repeatedly."""
+
+    def __init__(self, interval: float = 0.001) -> None:
+        self.interval = interval
+        self.longest = 0.0
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.longest = max(self.longest, time.perf_counter() - start - self.interval)
+
+
+async def crawl_once(
+    server: MockQzone,
+    session: ClientSession,
+    args,
+    metrics: t.Optional[Metrics] = None,
+    executor: t.Optional[Executor] = None,
+) -> t.Dict[str, float]:
+    api = FeedApi(server.client(session), server.login())
+    api.prefetch = args.prefetch
+    api.metrics = metrics
+    api.parse_executor = executor
+    first: t.List[float] = []
+    got = 0
+
+    def on_feed(bid, feed):
+        nonlocal got
+        got += 1
+        if not first:
+            first.append(time.perf_counter())
+
+    api.feed_processed.add_impl(on_feed)
+    server.requests.clear()
+
+    watcher = StallWatcher()
+    watching = asyncio.ensure_future(watcher.run())
+    start = time.perf_counter()
+    if args.mode == "count":
+        await api.get_feeds_by_count(args.count, uin=args.uin)
+    else:
+        await api.get_feeds_by_second(args.seconds, uin=args.uin)
+    await api.wait()
+    end = time.perf_counter()
+    watching.cancel()
+
+    return dict(
+        ttff=(first[0] if first else end) - start,
+        wait=end - start,
+        feeds=got,
+        requests=sum(server.requests.values()),
+        stall=watcher.longest,
+    )
+
+
+async def heartbeat_once(server: MockQzone, session: ClientSession) -> float:
+    api = FeedApi(server.client(session), server.login())
+    start = time.perf_counter()
+    r = await api.heartbeat_refresh()
+    assert not isinstance(r, BaseException), r
+    return time.perf_counter() - start
+
+
+async def main(args):
+    feeds = None
+    if args.replay:
+        with open(args.replay) as f:
+            feeds = json.load(f)
+
+    async with MockQzone(
+        feeds,
+        n_feeds=args.feeds,
+        page_size=args.page_size,
+        hasmore_ratio=args.hasmore,
+        latency=args.latency,
+        jitter=args.jitter,
+    ) as server, ClientSession() as session:
+        if args.mode == "heartbeat":
+            costs = [await heartbeat_once(server, session) for _ in range(args.rounds)]
+            summarize("heartbeat_refresh", costs)
+            return
+
+        metrics = Metrics() if args.metrics else None
+        executor = None
+        if args.offload == "thread":
+            executor = ThreadPoolExecutor(args.workers)
+        elif args.offload == "process":
+            executor = ProcessPoolExecutor(args.workers)
+        try:
+            results = [
+                await crawl_once(server, session, args, metrics, executor)
+                for _ in range(args.rounds)
+            ]
+        finally:
+            if executor:
+                executor.shutdown()
+
+    total_feeds = sum(r["feeds"] for r in results)
+    total_time = sum(r["wait"] for r in results)
+    print(
+        f"mode={args.mode} rounds={args.rounds} feeds/round={total_feeds / len(results):.0f} "
+        f"prefetch={args.prefetch} latency={args.latency}s offload={args.offload}"
+    )
+    print(f"{'feeds/sec':<22} {total_feeds / total_time:9.1f}")
+    summarize("time-to-first-feed", [r["ttff"] for r in results])
+    summarize("time-to-wait()", [r["wait"] for r in results])
+    summarize("requests/crawl", [r["requests"] for r in results], unit="", scale=1)
+    # the mock server shares the loop, so this includes its own blocking
+    summarize("longest loop stall", [r["stall"] for r in results])
+    if metrics:
+        print(metrics.prometheus(), end="")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["count", "second", "heartbeat"], default="count")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--feeds", type=int, default=200, help="number of synthetic feeds")
+    parser.add_argument("--replay", help="json file of recorded raw feeds")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--hasmore", type=float, default=0.1, help="ratio of hasmore feeds")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--prefetch", type=int, default=0)
+    parser.add_argument("--metrics", action="store_true", help="print per-stage metrics")
+    parser.add_argument(
+        "--offload", choices=["none", "thread", "process"], default="none", help="parse pages in"
+    )
+    parser.add_argument("--workers", type=int, default=2, help="workers of --offload")
+    parser.add_argument("--uin", type=int, help="crawl the profile of this uin, e.g. 10000")
+    parser.add_argument("--count", type=int, default=10, help="used by count mode, at most 10")
+    parser.add_argument("--seconds", type=float, default=86400, help="used by second mode")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(args))
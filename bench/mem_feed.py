@@ -0,0 +1,89 @@
+"""Measure memory cost per feed of :class:`~aioqzone_feed.type.FeedContent`.
+
+"before" is an equivalent set of plain dataclasses (with ``__dict__``, no interning),
+"after" is the slotted types in :mod:`aioqzone_feed.type`.
+
+Usage: ``python bench/mem_feed.py [N]``
+"""
+
+import sys
+import tracemalloc
+from dataclasses import MISSING, field, fields, make_dataclass
+
+from aioqzone.utils.entity import split_entities
+
+from aioqzone_feed.type import FeedContent, VisualMedia
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+NICKNAMES = [f"nickname{i}" for i in range(50)]
+PHOTO = (
+    "https://photogz.photo.store.qq.com/psc?/V14ZaBeY2NdvMX/{}/b&bo=OAQ4BAAAAAADFzA!&rf=viewer_4"
+)
+
+
+def unslotted(cls):
+    spec = [
+        (f.name, f.type, field(default=f.default, default_factory=f.default_factory))
+        for f in fields(cls)
+    ]
+    return make_dataclass("Plain" + cls.__name__, spec)
+
+
+PlainMedia = unslotted(VisualMedia)
+PlainFeed = unslotted(FeedContent)
+
+
+def copy(s: str) -> str:
+    """A new string object with the same value, like what a json parser returns."""
+    return s.encode().decode()
+
+
+def raw_feeds():
+    for i in range(N):
+        yield dict(
+            appid=311,
+            typeid=0,
+            fid=f"{i:024x}",
+            abstime=1700000000 + i,
+            uin=10000 + i % len(NICKNAMES),
+            nickname=copy(NICKNAMES[i % len(NICKNAMES)]),
+            curkey=f"http://user.qzone.qq.com/{10000 + i % 50}/mood/{i:024x}",
+            unikey=f"http://user.qzone.qq.com/{10000 + i % 50}/mood/{i:024x}",
+            summary=f"hello [em]e{100 + i % 10}[/em] world #{i}",
+            photos=[PHOTO.format(f"{i}-{j}") for j in range(i % 4)],
+        )
+
+
+def build(feed_cls, media_cls, intern: bool):
+    feeds = []
+    for d in raw_feeds():
+        photos = d.pop("photos")
+        summary = d.pop("summary")
+        if intern:
+            d["nickname"] = sys.intern(d["nickname"])
+        media = [
+            media_cls(
+                height=1080, width=1080, raw=p, is_video=False, thumbnail=p if intern else copy(p)
+            )
+            for p in photos
+        ]
+        feeds.append(feed_cls(entities=split_entities(summary), media=media, **d))
+    return feeds
+
+
+def measure(*args) -> float:
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    feeds = build(*args)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del feeds
+    return used / N
+
+
+if __name__ == "__main__":
+    before = measure(PlainFeed, PlainMedia, False)
+    after = measure(FeedContent, VisualMedia, True)
+    print(f"feeds: {N}")
+    print(f"before: {before:.0f} bytes/feed")
+    print(f"after:  {after:.0f} bytes/feed ({(after - before) / before:+.1%})")
@@ -0,0 +1,211 @@
+"""A local stand-in of Qzone H5 apis, used by benchmarks.
+
+It serves ``/mqzone/index``, ``getActiveFeeds``, ``/mqzone/profile``, ``get_feeds``,
+``shuoshuo`` and ``mfeeds_get_count`` from synthetic feeds, or from recorded raw feeds
+(a json list of ``vFeeds`` items), with configurable latency and page size.
+
+.. code-block:: python
+
+    async with MockQzone(n_feeds=200, hasmore_ratio=0.2, latency=0.05) as server:
+        async with ClientSession() as session:
+            api = FeedApi(server.client(session), server.login())
+"""
+
+import asyncio
+import json
+import random
+import time
+import typing as t
+from collections import Counter
+
+from aiohttp import ClientSession, web
+from aioqzone.api.login import Loginable
+from yarl import URL
+
+RawFeed = t.Dict[str, t.Any]
+FULL_SUMMARY = "full content of a long feed. " * 40
+
+
+def raw_feed(uin: int, abstime: int, summary: str = "", hasmore: bool = False) -> RawFeed:
+    """Build a raw feed dict in the scheme of ``vFeeds`` items."""
+    fid = f"{uin:x}{abstime:x}"
+    key = f"http://user.qzone.qq.com/{uin}/mood/{fid}"
+    return dict(
+        comm=dict(
+            time=abstime,
+            appid=311,
+            feedstype=0,
+            curlikekey=key,
+            orglikekey=key,
+            ugckey=f"{uin}_311_{fid}",
+            ugcrightkey=fid,
+            right_info={},
+            wup_feeds_type=0,
+        ),
+        id=dict(cellid=fid),
+        userinfo=dict(uin=uin, nickname=f"user{uin}"),
+        summary=dict(summary=summary, hasmore=hasmore),
+    )
+
+
+def synthetic_feeds(
+    n_feeds: int, n_users: int = 20, hasmore_ratio: float = 0.1, seed: int = 0
+) -> t.List[RawFeed]:
+    """Newest-first feeds, one per minute, owned by :obj:`n_users` users."""
+    rand = random.Random(seed)
+    now = int(time.time())
+    return [
+        raw_feed(
+            10000 + i % n_users,
+            now - 60 * i,
+            f"feed #{i} [em]e100[/em]",
+            hasmore=rand.random() < hasmore_ratio,
+        )
+        for i in range(n_feeds)
+    ]
+
+
+class _FakeLogin(Loginable):
+    async def _new_cookie(self) -> t.Dict[str, str]:
+        return dict(p_skey="mock")
+
+
+class LocalClient:
+    """Send requests of Qzone apis to the mock server, keeping paths and params."""
+
+    def __init__(self, session: ClientSession, base: URL) -> None:
+        self.session = session
+        self.base = base
+
+    def request(self, method: str, url: t.Union[str, URL], **kwds):
+        return self.session.request(method, self.base.with_path(URL(url).path), **kwds)
+
+
+class MockQzone:
+    """Serve feeds on a random local port. :obj:`.requests` counts requests by path."""
+
+    def __init__(
+        self,
+        feeds: t.Optional[t.List[RawFeed]] = None,
+        *,
+        n_feeds: int = 100,
+        page_size: int = 10,
+        hasmore_ratio: float = 0.1,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        active_cnt: int = 5,
+        seed: int = 0,
+    ) -> None:
+        """
+        :param feeds: recorded raw feeds. If not given, synthetic feeds are generated.
+        :param latency: seconds to wait before responding each request.
+        :param jitter: max random seconds added to :obj:`latency`.
+        :param active_cnt: value returned by ``mfeeds_get_count``.
+        """
+        self.feeds = feeds or synthetic_feeds(n_feeds, hasmore_ratio=hasmore_ratio, seed=seed)
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.active_cnt = active_cnt
+        self.rand = random.Random(seed)
+        self.requests: t.Counter[str] = Counter()
+
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/mqzone/index", self.index)
+        app.router.add_get("/webapp/json/mqzone_feeds/getActiveFeeds", self.active_feeds)
+        app.router.add_get("/mqzone/profile", self.profile)
+        app.router.add_get("/get_feeds", self.get_feeds)
+        app.router.add_get("/webapp/json/mqzone_detail/shuoshuo", self.shuoshuo)
+        app.router.add_get("/feeds/mfeeds_get_count", self.get_count)
+        self.runner = web.AppRunner(app)
+        self.base = URL()
+
+    async def __aenter__(self):
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.base = URL(f"http://127.0.0.1:{port}")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    def client(self, session: ClientSession) -> LocalClient:
+        return LocalClient(session, self.base)
+
+    def login(self, uin: int = 1) -> Loginable:
+        login = _FakeLogin(uin)
+        login.cookie = dict(p_skey="mock")
+        return login
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.requests[request.path] += 1
+        delay = self.latency + self.rand.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return await handler(request)
+
+    def _page(self, offset: int, uin: t.Optional[int] = None) -> t.Dict[str, t.Any]:
+        feeds = self.feeds
+        if uin:
+            feeds = [f for f in feeds if f["userinfo"]["uin"] == uin]
+        end = offset + self.page_size
+        return dict(
+            hasmore=end < len(feeds),
+            attachinfo=str(end),
+            newcnt=0,
+            undeal_info={},
+            vFeeds=feeds[offset:end],
+        )
+
+    @staticmethod
+    def _html(data: t.Any) -> web.Response:
+        script = (
+            'window.shine0callback = function(){ return "0123abcd"; };'
+            f"var FrontPage = {{ data: {json.dumps(data)} }};"
+        )
+        return web.Response(
+            text=f'<html><body><script type="application/javascript">{script}</script>'
+            "</body></html>",
+            content_type="text/html",
+        )
+
+    async def index(self, request: web.Request):
+        return self._html(dict(code=0, data=self._page(0)))
+
+    async def active_feeds(self, request: web.Request):
+        offset = int(request.query.get("attach_info") or 0)
+        return web.json_response(dict(code=0, data=self._page(offset)))
+
+    async def profile(self, request: web.Request):
+        uin = int(request.query["hostuin"])
+        info = dict(
+            count={},
+            coverinfo=[dict(cover="https://qzonestyle.gtimg.cn/cover.jpg")],
+            is_friend=True,
+            is_hide=0,
+            limit=0,
+            profile=dict(nickname=f"user{uin}", face="https://q.qlogo.cn/face.jpg", is_special=0),
+        )
+        return self._html([dict(code=0, data=info), dict(code=0, data=self._page(0, uin))])
+
+    async def get_feeds(self, request: web.Request):
+        uin = int(request.query["hostuin"])
+        offset = int(request.query.get("res_attach") or 0)
+        return web.json_response(dict(code=0, data=self._page(offset, uin)))
+
+    async def shuoshuo(self, request: web.Request):
+        fid = request.query["cellid"]
+        for f in self.feeds:
+            if f["id"]["cellid"] == fid:
+                break
+        else:
+            return web.json_response(dict(code=-10001, message="feed not found"))
+        detail = {f"cell_{k}": v for k, v in f.items()}
+        detail["cell_summary"] = dict(summary=FULL_SUMMARY, hasmore=False)
+        return web.json_response(dict(code=0, data=detail))
+
+    async def get_count(self, request: web.Request):
+        return web.json_response(dict(code=0, data=dict(active_cnt=self.active_cnt)))
@@ -1,4 +1,5 @@
 from .feed import FeedH5Api as FeedApi
 from .heartbeat import HeartbeatApi
+from .pool import FeedApiPool
 
-__all__ = ["FeedApi", "HeartbeatApi"]
+__all__ = ["FeedApi", "HeartbeatApi", "FeedApiPool"]
@@ -1,15 +1,34 @@
 import asyncio
+import copy
+import heapq
 import logging
 import time
+import tracemalloc
 import typing as t
+from concurrent.futures import Executor
+from dataclasses import replace
+from pathlib import Path
 
-from aioqzone.model.api.response import FeedPageResp, ProfileResp
+from aioqzone.exception import QzoneError
+from aioqzone.model.api.response import DetailResp, FeedPageResp, ProfileResp
 
 from aioqzone_feed.api.heartbeat import HeartbeatApi
+from aioqzone_feed.api.offload import ParsedPage, parse_page, raw_page_api
 from aioqzone_feed.message import FeedApiEmitterMixin
-from aioqzone_feed.type import FEED_TYPES, FeedContent
+from aioqzone_feed.store import CrawlCursor, CrawlState, FeedStore
+from aioqzone_feed.type import FEED_TYPES, BaseFeed, FeedContent, VisualMedia
+from aioqzone_feed.utils.batch import Batcher
+from aioqzone_feed.utils.cache import TTLCache
+from aioqzone_feed.utils.emoji import EmojiTranslator
+from aioqzone_feed.utils.executor import BoundedExecutor
+from aioqzone_feed.utils.fingerprint import FingerprintIndex
+from aioqzone_feed.utils.media import MediaCache
+from aioqzone_feed.utils.metrics import timed
+from aioqzone_feed.utils.rules import DropRules
+from aioqzone_feed.utils.seen import SeenCache
 
 log = logging.getLogger(__name__)
+_Page = t.Tuple[FeedPageResp, t.Optional[t.List[t.Optional[FeedContent]]]]
 MAX_BID = 0x7FFF
 """The max batch id.
 
@@ -17,12 +36,167 @@ MAX_BID = 0x7FFF
 """
 
 
+def _copy_model(model: FeedContent) -> FeedContent:
+    """Copy a cached model, so that translating or updating it does not affect others. Entities
+    and media are replaced rather than changed, so their lists are copied but not themselves."""
+    model = copy.copy(model)
+    model.entities = model.entities[:]
+    model.media = model.media[:]
+    if isinstance(model.forward, FeedContent):
+        model.forward = _copy_model(model.forward)
+    return model
+
+
+class _Newest(t.NamedTuple):
+    """Heap item that pops the newest feed first. Ties are broken by stream index."""
+
+    feed: FeedContent
+    idx: int
+
+    def __lt__(self, o: "_Newest") -> bool:  # type: ignore[override]
+        if o.feed < self.feed:
+            return True
+        if self.feed < o.feed:
+            return False
+        return self.idx < o.idx
+
+
 class FeedH5Api(FeedApiEmitterMixin, HeartbeatApi):
     """
     .. versionadded:: 0.13.0
     """
 
     bid = 0
+    prefetch = 0
+    """Number of pages that can be fetched ahead of the page being dispatched. Prefetching
+    overlaps network round trips with feed dispatching. Defaults to 0, means no prefetching.
+
+    .. versionadded:: 1.3.0
+    """
+    lazy_detail = False
+    """If True, details (entities, forward and media) of :class:`.FeedContent` are computed
+    on first access. This saves cpu for consumers that ignore most feeds.
+
+    .. versionadded:: 1.3.0
+    """
+    store: t.Optional[FeedStore] = None
+    """If set, processed feeds are saved into it, so are the states of
+    :meth:`.get_feeds_incremental`. A restarted process then resumes from the saved states.
+
+    .. versionadded:: 1.3.0
+    """
+    detail_cache: t.Optional[TTLCache[t.Tuple[str, int, int], DetailResp]] = None
+    """If set, full contents fetched for feeds with `hasmore` flag are cached by
+    ``(fid, uin, appid)``, and concurrent fetches of the same feed are coalesced.
+
+    .. versionadded:: 1.3.0
+    """
+    page_cache: t.Optional[TTLCache[t.Tuple[int, str], _Page]] = None
+    """If set, concurrent fetches of the same page, i.e. the same host uin (``0`` for the
+    active feeds) and `attach_info`, share one request, and fetched pages are reused within
+    its `ttl`. This saves requests when crawls overlap, e.g. a heartbeat-triggered crawl and
+    an on-demand one. Pages change quickly, so a short `ttl` is suggested, e.g.
+    ``TTLCache(maxsize=64, ttl=5)``. Each crawl still applies its own predicates.
+
+    .. versionadded:: 1.3.0
+    """
+    emoji: t.Optional[EmojiTranslator] = None
+    """If set, emojis in entities of processed feeds, and of their forwarded feeds, are
+    translated into text. Emojis of a page are looked up in one batch before its feeds are
+    dispatched. With :obj:`.lazy_detail`, they are translated on first access.
+
+    .. versionadded:: 1.3.0
+    """
+    fingerprints: t.Optional[FingerprintIndex] = None
+    """If set, processed feeds are checked against it by their
+    :obj:`~aioqzone_feed.type.FeedContent.fingerprint`. A known feed whose content is not
+    changed is not delivered again; a known feed whose content is changed is delivered through
+    :obj:`.feed_edited` instead of :obj:`.feed_processed` (or streaming apis). Feeds skipped
+    by :obj:`.seen_cache` are never checked. Checking a feed computes its details, even if
+    :obj:`.lazy_detail` is set.
+
+    .. versionadded:: 1.3.0
+    """
+    media_cache: t.Optional[MediaCache] = None
+    """If set, media of processed feeds are downloaded into it in background through
+    :obj:`.media_executor`: raw photos, and covers of videos. Then :obj:`.feed_media_updated`
+    is emitted with a copy of the feed whose media urls are replaced by ``file://`` urls of
+    local files. :meth:`.wait` does not wait for media, use :meth:`.wait_media` instead.
+
+    Files may be evicted later, so :obj:`.store` keeps the remote urls. Use
+    :meth:`.MediaCache.localize` to get local urls when reading stored feeds.
+
+    .. versionadded:: 1.3.0
+    """
+    parse_executor: t.Optional[Executor] = None
+    """If set, pages except the first one are parsed, and their feeds are converted, in this
+    executor instead of the event loop. It can be a
+    :class:`~concurrent.futures.ThreadPoolExecutor` or a
+    :class:`~concurrent.futures.ProcessPoolExecutor`. Only the latter keeps the cpu time off
+    the loop thoroughly. Feeds converted in it ignore :obj:`.lazy_detail`.
+
+    .. seealso:: :mod:`aioqzone_feed.api.offload`
+
+    .. versionadded:: 1.3.0
+    """
+    backpressure: t.Optional[t.Tuple[int, int]] = None
+    """``(high, low)`` marks of pending tasks in :obj:`._ch_feed_dispatch` and
+    :obj:`.ch_feed_notify`. If set, once a page is dispatched and the pending tasks exceed the
+    high mark, fetching next page is paused until they drop to the low mark. This bounds the
+    memory held by pending feeds when handlers are slower than fetching.
+    See :obj:`.peak_pending` to tune it.
+
+    .. versionadded:: 1.3.0
+    """
+    seen_cache: t.Optional[SeenCache] = None
+    """If set, feeds that have been seen are skipped before any model is built, and
+    :obj:`.feed_skipped` is emitted instead. Skipped feeds are still counted in the returned number.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(self, *args, **kwds) -> None:
+        super().__init__(*args, **kwds)
+        self.watermarks: t.Dict[int, t.Tuple[int, int]] = {}
+        """High-water marks used by :meth:`.get_feeds_incremental`. It maps a host uin (``0`` for
+        the active feeds of the login user) to the newest ``(abstime, uin)`` delivered.
+
+        .. versionadded:: 1.3.0
+        """
+        self.drop_rules = DropRules.default()
+        """Rules used by :meth:`.drop_rule`. Update or replace it to customize dropping, even
+        during a crawl.
+
+        .. versionadded:: 1.3.0
+        """
+        self.media_executor = BoundedExecutor(max_inflight=4)
+        """Executor used to download media for :obj:`.media_cache`. Its `max_inflight` bounds
+        the connections used by media downloading.
+
+        .. versionadded:: 1.3.0
+        """
+        self.expand_executor = BoundedExecutor(max_inflight=4)
+        """Executor used to fetch the full content of feeds whose `hasmore` flag is set.
+        Replace it to configure concurrency, rate limit and retry policy. Use its
+        :obj:`~.BoundedExecutor.stats` to observe the queue depth.
+
+        .. versionadded:: 1.3.0
+        """
+        self._dispatching: t.Set[asyncio.Future] = set()
+        self._notifying: t.Set[asyncio.Future] = set()
+        self.peak_pending = 0
+        """The max number of pending tasks in :obj:`._ch_feed_dispatch` and
+        :obj:`.ch_feed_notify`, sampled once a page is dispatched. Reset it to observe again.
+
+        .. versionadded:: 1.3.0
+        """
+        self.processed_batcher: Batcher[int, FeedContent] = Batcher(self._emit_batch)
+        """Batches feeds for :obj:`.feed_processed_batch`. A batch is emitted once it is full,
+        once its first feed waits for `max_delay`, or once a page is dispatched. Set its
+        `max_size` and `max_delay` to configure it.
+
+        .. versionadded:: 1.3.0
+        """
 
     def new_batch(self) -> int:
         """
@@ -59,59 +233,307 @@ class FeedH5Api(FeedApiEmitterMixin, HeartbeatApi):
 
         return await self.get_feeds(uin, attach_info)
 
+    async def _fetch_page(
+        self,
+        uin: t.Optional[int],
+        attach_info: str,
+        limiter: t.Optional[t.AsyncContextManager] = None,
+    ) -> _Page:
+        if self.page_cache is not None:
+            fetch = lambda: self._fetch_page_uncached(uin, attach_info, limiter)
+            resp, models = await self.page_cache.get_or_fetch((uin or 0, attach_info), fetch)
+            # models are mutable and dispatched by each crawl
+            return resp, models and [m and _copy_model(m) for m in models]
+        return await self._fetch_page_uncached(uin, attach_info, limiter)
+
+    async def _fetch_page_uncached(
+        self,
+        uin: t.Optional[int],
+        attach_info: str,
+        limiter: t.Optional[t.AsyncContextManager] = None,
+    ) -> _Page:
+        if limiter is not None:
+            async with limiter:
+                return await self._fetch_page_uncached(uin, attach_info)
+        if self.metrics is None:
+            return await self._fetch_page_by(uin, attach_info)
+        self.metrics.inc("pages")
+        return await self.metrics.timed_await("page_fetch", self._fetch_page_by(uin, attach_info))
+
+    async def _fetch_page_by(self, uin: t.Optional[int], attach_info: str) -> _Page:
+        if (
+            self.parse_executor is None
+            or not attach_info
+            or not self.qzone_tokens.get(uin or self.login.uin)
+        ):
+            return await self.get_feedpage_by_uin(uin, attach_info), None
+
+        data = await self.call(raw_page_api(uin, attach_info))
+        loop = asyncio.get_event_loop()
+        r = await loop.run_in_executor(self.parse_executor, parse_page, data, bool(uin))
+        if isinstance(r, ParsedPage):
+            return r
+        code, msg = r
+        if code not in (-3000, -10000):
+            raise QzoneError(code, msg)
+        # login expired. The common way will relogin and retry.
+        return await self.get_feedpage_by_uin(uin, attach_info), None
+
+    async def _iter_pages(
+        self,
+        uin: t.Optional[int] = None,
+        attach_info: str = "",
+        limiter: t.Optional[t.AsyncContextManager] = None,
+    ) -> t.AsyncGenerator[_Page, None]:
+        """Yield feed pages one by one, starting from :obj:`attach_info`. Each page is yielded
+        with its converted feeds if it is parsed by :obj:`.parse_executor`, otherwise None.
+
+        If :obj:`.prefetch` is positive, the next pages are fetched in background while the
+        current page is being consumed. Closing this generator cancels any pending prefetch.
+
+        :param limiter: if given, each page is fetched within this context manager.
+
+        :raise `tenacity.RetryError`: Exception from :meth:`.get_feedpage_by_uin`.
+
+        .. versionadded:: 1.3.0
+        """
+        if self.prefetch <= 0:
+            while True:
+                page = await self._fetch_page(uin, attach_info, limiter)
+                yield page
+                resp = page[0]
+                if not resp.hasmore:
+                    return
+                attach_info = resp.attachinfo
+
+        pages: "asyncio.Queue[t.Union[_Page, Exception]]" = asyncio.Queue()
+        # at most `prefetch` pages can be fetched ahead of the page being consumed
+        slots = asyncio.Semaphore(self.prefetch)
+
+        async def producer(attach_info: str):
+            while True:
+                await slots.acquire()
+                try:
+                    page = await self._fetch_page(uin, attach_info, limiter)
+                except Exception as e:
+                    pages.put_nowait(e)
+                    return
+                pages.put_nowait(page)
+                if not page[0].hasmore:
+                    return
+                attach_info = page[0].attachinfo
+
+        task = asyncio.ensure_future(producer(attach_info))
+        try:
+            while True:
+                page = await pages.get()
+                if isinstance(page, Exception):
+                    raise page
+                slots.release()
+                yield page
+                if not page[0].hasmore:
+                    return
+        finally:
+            task.cancel()
+
     async def _get_feeds_by_pred(
         self,
         stop_pred: t.Callable[[FEED_TYPES, int], bool],
         uin: t.Optional[int] = None,
         filter_pred: t.Optional[t.Callable[[FEED_TYPES], bool]] = None,
+        *,
+        watermark: bool = False,
+        sink: t.Optional[t.Callable[[t.Any], t.Any]] = None,
+        gate: t.Optional[t.Callable[[], t.Awaitable[t.Any]]] = None,
+        ordered: bool = False,
+        limiter: t.Optional[t.AsyncContextManager] = None,
+        cursor: t.Optional[CrawlCursor] = None,
+        bid: t.Optional[int] = None,
     ):
         """
         :meta public:
-        :return: number of feeds that we have fetched actually.
+        :param watermark: stop at the high-water mark of this `uin` in :obj:`.watermarks`,
+            and advance the mark to the newest feed got after the fetching completes.
+            If :obj:`.store` is set, the state is saved after each page, and an unfinished
+            crawl is resumed from its last page.
+        :param sink: if given, processed feeds are passed to it instead of :obj:`.feed_processed`,
+            and this method returns after all feeds of this call are passed to the sink.
+        :param gate: if given, it is awaited before fetching the next page. So is
+            :obj:`.backpressure` applied.
+        :param ordered: only used with `sink`. Pass to the sink a future of each feed in page
+            order, instead of each processed feed once ready. See :meth:`._dispatch_ordered`.
+        :param limiter: if given, each page is fetched within this context manager.
+        :param cursor: if given, start from its page and count, and update it once a page is
+            dispatched. It is marked as done if the crawl is finished.
+        :param bid: batch id of the feeds of this call, defaults to :obj:`.bid`.
+        :return: number of feeds that we have fetched actually (in this call).
 
         :raise `tenacity.RetryError`: Exception from :meth:`.get_active_feeds`.
 
         .. note:: You may need :meth:`.new_batch` to generate a new batch id.
+
+        .. versionchanged:: 1.3.0
+
+            pages are fetched by :meth:`._iter_pages`, which supports prefetching.
+            :obj:`.stop_fetch_page` is evaluated once per page before :obj:`.stop_fetch`.
         """
+        if bid is None:
+            bid = self.bid
         stop_fetching = False
-        attach_info = ""
         cnt_got = 0
+        attach_info = ""
+        if cursor is not None:
+            cnt_got, attach_info = cursor.count, cursor.attach_info
+        cnt_start = cnt_got
+        mark = newest = None
+        if watermark:
+            state = self._load_crawl_state(uin or 0)
+            mark = newest = state.watermark
+            if state.attach_info:
+                log.info(f"resume crawl from {state.attach_info}")
+                attach_info = state.attach_info
+                newest = max(filter(None, (mark, state.pending)), default=None)
+        expanding: t.Set[asyncio.Future] = set()
 
-        while not stop_fetching:
-            resp = await self.get_feedpage_by_uin(uin, attach_info)
-            attach_info = resp.attachinfo
-            feeds = resp.vFeeds
-            stop_fetching = not resp.hasmore
+        pages = self._iter_pages(uin, attach_info, limiter)
+        try:
+            async for resp, models in pages:
+                log.debug(resp.attachinfo, extra=dict(got=cnt_got))
+                if self.metrics:
+                    self._record_depths()
 
-            log.debug(attach_info, extra=dict(got=cnt_got))
+                if self.emoji is not None:
+                    self.emoji.prefetch_feeds(resp.vFeeds)
 
-            for fd in feeds:
-                if filter_pred and filter_pred(fd):
-                    continue
-                if stop_pred(fd, cnt_got) or any(await self.stop_fetch.results(fd)):
-                    stop_fetching = True
-                    continue
-                cnt_got += 1
-                self._dispatch_feed(fd)
+                cut = len(resp.vFeeds)
+                if self.stop_fetch_page.has_impl:
+                    with timed(self.metrics, "stop_fetch"):
+                        cuts = await self.stop_fetch_page.results(resp.vFeeds)
+                    cut = min((i for i in cuts if i is not None), default=cut)
+
+                for idx, fd in enumerate(resp.vFeeds):
+                    if filter_pred and filter_pred(fd):
+                        continue
+                    key = (fd.abstime, fd.userinfo.uin)
+                    if idx >= cut or (mark and key <= mark):
+                        stop_fetching = True
+                        continue
+                    if stop_pred(fd, cnt_got):
+                        stop_fetching = True
+                        continue
+                    if self.stop_fetch.has_impl:
+                        with timed(self.metrics, "stop_fetch"):
+                            stop = any(await self.stop_fetch.results(fd))
+                        if stop:
+                            stop_fetching = True
+                            continue
+                    cnt_got += 1
+                    if watermark and (newest is None or key > newest):
+                        newest = key
+                    if self.seen_cache is not None and self.seen_cache.check(
+                        fd.userinfo.uin, fd.abstime
+                    ):
+                        if self.metrics:
+                            self.metrics.inc("skipped")
+                        if self.feed_skipped.has_impl:
+                            self._notify(self.feed_skipped.emit(bid, fd))
+                        continue
+                    model = models[idx] if models else None
+                    if ordered and sink:
+                        slot, fut = self._dispatch_ordered(fd, model, bid)
+                        sink(slot)
+                    else:
+                        fut = self._dispatch_feed(fd, sink=sink, model=model, bid=bid)
+                    if fut and sink:
+                        expanding.add(fut)
+
+                if not sink:
+                    self.processed_batcher.flush()
+                pending = self._pending()
+                self.peak_pending = max(self.peak_pending, pending)
+                if stop_fetching:
+                    break
+                if cursor is not None:
+                    cursor.attach_info, cursor.count = resp.attachinfo, cnt_got
+                if watermark and self.store:
+                    state = CrawlState(resp.attachinfo, mark, newest)
+                    self.store.save_state(self.login.uin, uin or 0, state)
+                if gate:
+                    await gate()
+                if self.backpressure and pending > self.backpressure[0]:
+                    await self._relieve(self.backpressure[1])
+
+            if expanding:
+                await asyncio.wait(expanding)
+        finally:
+            await pages.aclose()
+            for fut in expanding:
+                fut.cancel()
 
-        return cnt_got
+        if watermark:
+            if newest:
+                self.watermarks[uin or 0] = newest
+            if self.store:
+                self.store.save_state(self.login.uin, uin or 0, CrawlState(watermark=newest))
+        if cursor is not None:
+            cursor.count = cnt_got
+            cursor.done = True
+        return cnt_got - cnt_start
+
+    def _load_crawl_state(self, host: int) -> CrawlState:
+        """Get the crawl state of `host` from :obj:`.store`, and sync :obj:`.watermarks` with it.
+        If there is no store, the state is built from :obj:`.watermarks`.
+
+        .. versionadded:: 1.3.0
+        """
+        if self.store is None:
+            return CrawlState(watermark=self.watermarks.get(host))
+
+        state = self.store.load_state(self.login.uin, host)
+        if state.watermark:
+            self.watermarks[host] = state.watermark
+        else:
+            state = state._replace(watermark=self.watermarks.get(host))
+        return state
+
+    def _resume(self, cursor: CrawlCursor) -> None:
+        log.info(f"resume crawl from {cursor.attach_info or 'the first page'}")
 
     async def get_feeds_by_count(
         self,
         count: int = 10,
         *,
         uin: t.Optional[int] = None,
+        cursor: t.Optional[CrawlCursor] = None,
     ) -> int:
         """Get feeds by count.
 
         :param count: feeds count to get, max as 10, defaults to 10
+        :param cursor: a new cursor to record the progress, or a cursor of an interrupted
+            call to resume it. In the latter case, `count` and `uin` are taken from the cursor.
 
         .. seealso:: :meth:`._get_feeds_by_pred`.
+
+        .. versionchanged:: 1.3.0
+
+            add `cursor` parameter.
         """
-        if count <= 0:
-            return 0
-        count = min(count, 10)
-        return await self._get_feeds_by_pred(lambda _, cnt: cnt >= count, uin)
+        if cursor is not None and cursor.started:
+            if cursor.done:
+                return 0
+            self._resume(cursor)
+            count, uin = cursor.limit or 0, cursor.uin
+        else:
+            if count <= 0:
+                return 0
+            count = min(count, 10)
+
+            if cursor is not None:
+                cursor.uin, cursor.limit, cursor.bid = uin, count, self.bid
+
+        return await self._get_feeds_by_pred(
+            lambda _, cnt: cnt >= count, uin, cursor=cursor, bid=cursor.bid if cursor else None
+        )
 
     async def get_feeds_by_second(
         self,
@@ -119,26 +541,364 @@ class FeedH5Api(FeedApiEmitterMixin, HeartbeatApi):
         *,
         uin: t.Optional[int] = None,
         start: t.Optional[float] = None,
+        cursor: t.Optional[CrawlCursor] = None,
     ) -> int:
         """Get feeds by abstime (seconds). Range: [`start` - `seconds`, `start`].
 
         :param seconds: filter on abstime, calculate from `start`.
         :param start: start timestamp, defaults to None, means now.
+        :param cursor: a new cursor to record the progress, or a cursor of an interrupted
+            call to resume it. In the latter case, the time window and `uin` are taken from
+            the cursor.
 
         .. seealso:: :meth:`._get_feeds_by_pred`.
+
+        .. versionchanged:: 1.3.0
+
+            add `cursor` parameter.
+        """
+        if cursor is not None and cursor.started:
+            if cursor.done:
+                return 0
+            self._resume(cursor)
+            assert cursor.start is not None and cursor.end is not None
+            start, end, uin = cursor.start, cursor.end, cursor.uin
+        else:
+            if seconds <= 0:
+                return 0
+
+            start = start or time.time()
+            end = start - seconds
+
+            if end > time.time():
+                return 0
+
+            if cursor is not None:
+                cursor.uin, cursor.start, cursor.end, cursor.bid = uin, start, end, self.bid
+
+        return await self._get_feeds_by_pred(
+            lambda feed, _: feed.abstime < end,
+            uin,
+            lambda feed: feed.abstime > start,
+            cursor=cursor,
+            bid=cursor.bid if cursor else None,
+        )
+
+    async def _iter_feeds_by_pred(
+        self,
+        stop_pred: t.Callable[[FEED_TYPES, int], bool],
+        uin: t.Optional[int] = None,
+        filter_pred: t.Optional[t.Callable[[FEED_TYPES], bool]] = None,
+        *,
+        buffer: int = 10,
+        ordered: bool = False,
+        limiter: t.Optional[t.AsyncContextManager] = None,
+    ) -> t.AsyncGenerator[FeedContent, None]:
+        """Streaming version of :meth:`._get_feeds_by_pred`. Processed feeds are yielded as soon
+        as they are ready, instead of being emitted through :obj:`.feed_processed`.
+
+        Fetching next page is paused while more than :obj:`buffer` feeds are not consumed.
+        Closing this generator cancels the fetching, and returns after it is stopped.
+
+        :meta public:
+        :param buffer: max number of ready feeds before fetching is paused.
+        :param ordered: yield feeds in page order, i.e. newest first. A feed being expanded
+            holds back the feeds after it.
+        :param limiter: if given, each page is fetched within this context manager.
+
+        .. versionadded:: 1.3.0
+        """
+        if ordered:
+            it = self._iter_feeds_ordered(
+                stop_pred, uin, filter_pred, buffer=buffer, limiter=limiter
+            )
+            try:
+                async for feed in it:
+                    yield feed
+            finally:
+                # closing this generator does not close the inner one
+                await it.aclose()
+            return
+
+        ready: "asyncio.Queue[FeedContent]" = asyncio.Queue()
+        consumed = asyncio.Event()
+
+        async def gate():
+            while ready.qsize() >= buffer:
+                consumed.clear()
+                await consumed.wait()
+
+        crawl = asyncio.ensure_future(
+            self._get_feeds_by_pred(
+                stop_pred, uin, filter_pred, sink=ready.put_nowait, gate=gate, limiter=limiter
+            )
+        )
+        get: t.Optional[asyncio.Future] = None
+        try:
+            while True:
+                get = asyncio.ensure_future(ready.get())
+                await asyncio.wait((get, crawl), return_when=asyncio.FIRST_COMPLETED)
+                if get.done():
+                    consumed.set()
+                    yield get.result()
+                    continue
+
+                get.cancel()
+                while not ready.empty():
+                    yield ready.get_nowait()
+                crawl.result()
+                return
+        finally:
+            if get:
+                get.cancel()
+            crawl.cancel()
+            # wait for its cleanup, so that nothing runs after the generator is closed
+            await asyncio.gather(crawl, return_exceptions=True)
+
+    async def _iter_feeds_ordered(
+        self,
+        stop_pred: t.Callable[[FEED_TYPES, int], bool],
+        uin: t.Optional[int] = None,
+        filter_pred: t.Optional[t.Callable[[FEED_TYPES], bool]] = None,
+        *,
+        buffer: int = 10,
+        limiter: t.Optional[t.AsyncContextManager] = None,
+    ) -> t.AsyncGenerator[FeedContent, None]:
+        slots: "asyncio.Queue[asyncio.Future[t.Optional[FeedContent]]]" = asyncio.Queue()
+        consumed = asyncio.Event()
+
+        async def gate():
+            while slots.qsize() >= buffer:
+                consumed.clear()
+                await consumed.wait()
+
+        crawl = asyncio.ensure_future(
+            self._get_feeds_by_pred(
+                stop_pred,
+                uin,
+                filter_pred,
+                sink=slots.put_nowait,
+                gate=gate,
+                ordered=True,
+                limiter=limiter,
+            )
+        )
+        get: t.Optional[asyncio.Future] = None
+        try:
+            while True:
+                get = asyncio.ensure_future(slots.get())
+                await asyncio.wait((get, crawl), return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    get.cancel()
+                    if slots.empty():
+                        crawl.result()
+                        return
+                    continue
+                consumed.set()
+                if (feed := await get.result()) is not None:
+                    yield feed
+        finally:
+            if get:
+                get.cancel()
+            crawl.cancel()
+            # wait for its cleanup, so that nothing runs after the generator is closed
+            await asyncio.gather(crawl, return_exceptions=True)
+
+    async def iter_feeds_by_count(
+        self,
+        count: int = 10,
+        *,
+        uin: t.Optional[int] = None,
+        buffer: int = 10,
+    ) -> t.AsyncGenerator[FeedContent, None]:
+        """Streaming version of :meth:`.get_feeds_by_count`.
+
+        .. seealso:: :meth:`._iter_feeds_by_pred`.
+
+        .. versionadded:: 1.3.0
+        """
+        if count <= 0:
+            return
+        count = min(count, 10)
+        it = self._iter_feeds_by_pred(lambda _, cnt: cnt >= count, uin, buffer=buffer)
+        try:
+            async for feed in it:
+                yield feed
+        finally:
+            await it.aclose()
+
+    async def iter_feeds_by_second(
+        self,
+        seconds: float,
+        *,
+        uin: t.Optional[int] = None,
+        start: t.Optional[float] = None,
+        buffer: int = 10,
+    ) -> t.AsyncGenerator[FeedContent, None]:
+        """Streaming version of :meth:`.get_feeds_by_second`.
+
+        .. code-block:: python
+
+            async for feed in api.iter_feeds_by_second(86400):
+                ...
+
+        .. seealso:: :meth:`._iter_feeds_by_pred`.
+
+        .. versionadded:: 1.3.0
         """
         if seconds <= 0:
-            return 0
+            return
 
         start = start or time.time()
         end = start - seconds
 
         if end > time.time():
-            return 0
+            return
 
-        return await self._get_feeds_by_pred(
-            lambda feed, _: feed.abstime < end, uin, lambda feed: feed.abstime > start
+        it = self._iter_feeds_by_pred(
+            lambda feed, _: feed.abstime < end,
+            uin,
+            lambda feed: feed.abstime > start,
+            buffer=buffer,
         )
+        try:
+            async for feed in it:
+                yield feed
+        finally:
+            await it.aclose()
+
+    async def iter_feeds_by_uins(
+        self,
+        uins: t.Iterable[int],
+        seconds: t.Union[float, t.Mapping[int, float]],
+        *,
+        start: t.Optional[float] = None,
+        concurrency: int = 8,
+        buffer: int = 10,
+    ) -> t.AsyncGenerator[FeedContent, None]:
+        """Crawl profiles of several users concurrently, and yield their feeds in one stream,
+        newest first.
+
+        Each profile is crawled as :meth:`.iter_feeds_by_second` does, with its own stop
+        conditions. The streams are merged with a heap, so a feed is yielded once every
+        unfinished profile has a feed ready to compare with.
+
+        .. code-block:: python
+
+            async for feed in api.iter_feeds_by_uins(friends, 86400, concurrency=16):
+                ...
+
+        If a profile fails to be crawled, e.g. it is private, the error is emitted through
+        :obj:`.feed_crawl_failed` and the other profiles go on.
+
+        :param uins: users whose profiles are crawled.
+        :param seconds: crawl feeds in this period, or a mapping from uin to its own period.
+            Users missing from the mapping are skipped.
+        :param start: same as :meth:`.get_feeds_by_second`, defaults to now.
+        :param concurrency: max number of pages being fetched at the same time.
+        :param buffer: max number of ready feeds of each profile before its fetching is paused.
+
+        .. versionadded:: 1.3.0
+        """
+        start = start or time.time()
+        limiter = asyncio.Semaphore(concurrency)
+        uins = list(uins)
+        if isinstance(seconds, t.Mapping):
+            if missing := [uin for uin in uins if uin not in seconds]:
+                log.warning(f"no period is given for {missing}, skipped")
+            uins = [uin for uin in uins if uin in seconds]
+
+        def stream(uin: int) -> t.AsyncGenerator[FeedContent, None]:
+            end = start - (seconds[uin] if isinstance(seconds, t.Mapping) else seconds)
+            return self._iter_feeds_by_pred(
+                lambda feed, _: feed.abstime < end,
+                uin,
+                lambda feed: feed.abstime > start,
+                buffer=buffer,
+                ordered=True,
+                limiter=limiter,
+            )
+
+        streams = [stream(uin) for uin in uins]
+        heads = {i: asyncio.ensure_future(s.__anext__()) for i, s in enumerate(streams)}
+        heap: t.List[_Newest] = []
+        try:
+            while heads or heap:
+                if heads:
+                    await asyncio.wait(heads.values())
+                for i, fut in list(heads.items()):
+                    del heads[i]
+                    try:
+                        heapq.heappush(heap, _Newest(fut.result(), i))
+                    except StopAsyncIteration:
+                        pass
+                    except Exception as e:
+                        # a failed stream is finished, others go on
+                        log.warning(f"failed to crawl the profile of {uins[i]}, skipped: {e}")
+                        self._notify(self.feed_crawl_failed.emit(uins[i], e))
+                if not heap:
+                    break
+
+                item = heapq.heappop(heap)
+                yield item.feed
+                heads[item.idx] = asyncio.ensure_future(streams[item.idx].__anext__())
+        finally:
+            for fut in heads.values():
+                fut.cancel()
+            # a generator cannot be closed while its __anext__ is running
+            await asyncio.gather(*heads.values(), return_exceptions=True)
+            for s in streams:
+                await s.aclose()
+
+    async def get_feeds_incremental(
+        self,
+        hint: t.Optional[int] = None,
+        *,
+        uin: t.Optional[int] = None,
+        slack: int = 10,
+        window: int = 100,
+    ) -> int:
+        """Get feeds newer than the high-water mark in :obj:`.watermarks`, thus each call costs
+        in proportion to the number of new feeds. The mark is advanced after fetching completes.
+
+        This is designed to be called on :obj:`.hb_refresh`, e.g.
+        ``api.hb_refresh.add_impl(lambda cnt: api.get_feeds_incremental(cnt))``.
+
+        :param hint: number of new feeds, e.g. the `active_cnt` from heartbeat. If it is 0, no
+            request will be sent. If there is no mark yet, it limits the feeds count to get,
+            defaults to 10 in that case.
+        :param slack: if there is a mark, at most `hint` + `slack` feeds are got before it is
+            reached, so that a stale mark does not walk through the whole history.
+        :param window: max feeds count to get before reaching the mark if `hint` is not given.
+
+        .. seealso:: :meth:`._get_feeds_by_pred`.
+
+        .. versionadded:: 1.3.0
+        """
+        if hint is not None and hint <= 0:
+            return 0
+
+        if self._load_crawl_state(uin or 0).watermark:
+            count = window if hint is None else hint + slack
+            warned = False
+
+            def stop_pred(_, cnt: int) -> bool:
+                nonlocal warned
+                if cnt < count:
+                    return False
+                if not warned:
+                    warned = True
+                    log.warning(
+                        f"watermark of {uin or 0} is not reached in {count} feeds, "
+                        "older feeds since the mark are skipped"
+                    )
+                return True
+
+        else:
+            count = hint or 10
+            stop_pred = lambda _, cnt: cnt >= count
+
+        return await self._get_feeds_by_pred(stop_pred, uin, watermark=True)
 
     def drop_rule(self, feed: FEED_TYPES) -> bool:
         """Drop feeds according to some rules.
@@ -148,43 +908,286 @@ class FeedH5Api(FeedApiEmitterMixin, HeartbeatApi):
 
         :param feed: the feed
         :return: if the feed is dropped.
-        """
-        if feed.userinfo.uin == 20050606:
-            log.info(f"advertisement rule hit: {feed.userinfo.uin}")
-            log.debug(f"Dropped: {feed}")
-            return True
 
-        if feed.fid.startswith("advertisement"):
-            log.info(f"advertisement rule hit: {feed.fid}")
-            log.debug(f"Dropped: {feed}")
-            return True
+        .. versionchanged:: 1.3.0
 
-        return False
+            rules are defined by :obj:`.drop_rules`.
+        """
+        reason = self.drop_rules.match(feed)
+        if reason is None:
+            return False
+        log.info(f"drop rule hit: {reason} of {feed.fid}")
+        log.debug(f"Dropped: {feed}")
+        return True
 
-    def _dispatch_feed(self, feed: FEED_TYPES) -> None:
+    def _dispatch_feed(
+        self,
+        feed: FEED_TYPES,
+        expand: bool = True,
+        sink: t.Optional[t.Callable[[FeedContent], t.Any]] = None,
+        model: t.Optional[FeedContent] = None,
+        bid: t.Optional[int] = None,
+    ) -> t.Optional[asyncio.Future]:
         """dispatch feed according to api support.
 
         1. Drop feed according to rules defined in `drop_rule`, trigger :meth:`FeedDropped` hook if dropped;
-        2. Get more if `hasmore` flag is set to ``1`` (Not Implemented yet);
-        3. Trigger :meth:`FeedProcEnd` for prcocessed feeds.
+        2. Fetch full content by :meth:`._expand_feed` if `hasmore` flag is set;
+        3. Trigger :meth:`FeedProcEnd` for prcocessed feeds, or pass them to `sink` if given.
+           If :obj:`.fingerprints` is set, known feeds are skipped, or trigger
+           :obj:`.feed_edited` if their content is changed. Processed feeds are also
+           batched for :obj:`.feed_processed_batch`.
 
         :param feed: feed
+        :param expand: whether to fetch the full content if `hasmore` flag is set.
+        :param sink: a callable to receive the processed feed.
+        :param model: `feed` converted already, e.g. by :obj:`.parse_executor`.
+        :param bid: batch id of the feed, defaults to :obj:`.bid`.
+        :return: the expanding task if the feed is being expanded.
+
+        .. versionchanged:: 1.3.0
+
+            expanding is done by :obj:`.expand_executor`. Feeds are dropped before expanding
+            and before any model is built. :obj:`.feed_dropped` receives a :class:`.BaseFeed`,
+            which is built only if the emitter has implementations. :obj:`.feed_processed`
+            and :obj:`.feed_processed_batch` are also emitted only if they have implementations.
         """
-        if feed.summary.hasmore:
-            self._ch_feed_dispatch.add_awaitable(
-                self.shuoshuo(feed.fid, feed.userinfo.uin, feed.common.appid)
-            ).add_done_callback(lambda t: self._dispatch_feed(t.result()))
+        if bid is None:
+            bid = self.bid
+        if self.drop_rule(feed):
+            if self.metrics:
+                self.metrics.inc("dropped")
+            if self.feed_dropped.has_impl:
+                model = BaseFeed.from_feed(feed)
+                self._notify(self.feed_dropped.emit(bid, model))
             return
 
-        model = FeedContent.from_feed(feed)
+        if expand and feed.summary.hasmore:
+            return self._dispatch(self._expand_feed(feed, bid, sink))
 
-        if self.drop_rule(feed):
-            FeedContent.from_feed(feed)
-            self.ch_feed_notify.add_awaitable(self.feed_dropped.emit(self.bid, model))
+        if model is None:
+            with timed(self.metrics, "convert"):
+                model = FeedContent.from_feed(feed)
+
+            with timed(self.metrics, "set_detail"):
+                model.set_detail(feed, lazy=self.lazy_detail, translate=self.emoji)
+        elif self.emoji is not None:
+            model.translate(self.emoji)
+        old_fp = None
+        if self.fingerprints is not None:
+            old_fp = self.fingerprints.update(model)
+            if old_fp == model.fingerprint:
+                if self.metrics:
+                    self.metrics.inc("unchanged")
+                return
+        if self.store is not None:
+            self.store.add(model)
+        if self.media_cache is not None and model.media:
+            self.ch_media.add_awaitable(self._update_media(bid, model))
+        if old_fp is not None:
+            if self.metrics:
+                self.metrics.inc("edited")
+            self._notify(self.feed_edited.emit(bid, model, old_fp))
+            return
+        if self.metrics:
+            self.metrics.inc("processed")
+        if sink is not None:
+            sink(model)
+            return
+        if self.feed_processed_batch.has_impl:
+            self.processed_batcher.add(bid, model)
+        if not self.feed_processed.has_impl:
+            return
+        if self.metrics is None:
+            self._notify(self.feed_processed.emit(bid, model))
+        else:
+            self._notify(self.metrics.timed_await("handler", self.feed_processed.emit(bid, model)))
+
+    def _emit_batch(self, bid: int, feeds: t.List[FeedContent]) -> None:
+        emit = self.feed_processed_batch.emit(bid, feeds)
+        if self.metrics is not None:
+            self.metrics.inc("batches")
+            emit = self.metrics.timed_await("batch_handler", emit)
+        self._notify(emit)
+
+    def _dispatch_ordered(
+        self,
+        feed: FEED_TYPES,
+        model: t.Optional[FeedContent] = None,
+        bid: t.Optional[int] = None,
+    ) -> t.Tuple["asyncio.Future[t.Optional[FeedContent]]", t.Optional[asyncio.Future]]:
+        """Dispatch a feed by :meth:`._dispatch_feed`, with its result caught in a future.
+
+        :return: a future of the processed feed, which is None if the feed is dropped;
+            and the expanding task if the feed is being expanded.
+
+        .. versionadded:: 1.3.0
+        """
+        slot: "asyncio.Future[t.Optional[FeedContent]]" = asyncio.get_event_loop().create_future()
+
+        def settle(model: t.Optional[FeedContent]):
+            if not slot.done():
+                slot.set_result(model)
+
+        fut = self._dispatch_feed(feed, sink=settle, model=model, bid=bid)
+        if fut is None:
+            settle(None)
+        else:
+            fut.add_done_callback(lambda _: settle(None))
+        return slot, fut
+
+    async def _expand_feed(
+        self,
+        feed: FEED_TYPES,
+        bid: int,
+        sink: t.Optional[t.Callable[[FeedContent], t.Any]] = None,
+    ) -> None:
+        """Fetch the full content of a feed through :obj:`.detail_cache` and
+        :obj:`.expand_executor`, then dispatch it. If failed, :obj:`.feed_expand_failed` is
+        emitted and the original feed is dispatched.
+
+        .. versionadded:: 1.3.0
+        """
+        fid, uin, appid = feed.fid, feed.userinfo.uin, feed.common.appid
+        fetch = lambda: self.expand_executor.submit(lambda: self.shuoshuo(fid, uin, appid))
+        try:
+            with timed(self.metrics, "expand"):
+                if self.detail_cache is None:
+                    detail = await fetch()
+                else:
+                    detail = await self.detail_cache.get_or_fetch((fid, uin, appid), fetch)
+        except Exception as e:
+            log.warning(f"failed to get full content of {feed.fid}: {e}")
+            if self.metrics:
+                self.metrics.inc("expand_failed")
+            self._notify(self.feed_expand_failed.emit(bid, feed, e))
+            self._dispatch_feed(feed, expand=False, sink=sink, bid=bid)
+            return
+
+        self._dispatch_feed(detail, expand=False, sink=sink, bid=bid)
+
+    async def _fetch_media(self, url: str) -> Path:
+        """Get a media from :obj:`.media_cache`, or download it.
+
+        :return: path of the local file.
+        """
+        assert self.media_cache is not None
+        path = self.media_cache.get(url)
+        if path is None:
+
+            async def download():
+                async with self.client.request("GET", url) as r:
+                    r.raise_for_status()
+                    return await r.read()
+
+            with timed(self.metrics, "media"):
+                data = await self.media_executor.submit(download)
+            path = self.media_cache.put(url, data)
+        return path
+
+    async def _update_media(self, bid: int, feed: FeedContent) -> None:
+        """Cache media of a processed feed, then emit :obj:`.feed_media_updated` with a copy of
+        it. Media failed to be fetched keep their original urls. The feed itself, which may be
+        delivered already, and the one in :obj:`.store` are not changed.
+
+        .. versionadded:: 1.3.0
+        """
+        assert self.media_cache is not None
+        media = feed.media
+        urls = [m.thumbnail if m.is_video else m.raw for m in media]
+        local = await asyncio.gather(
+            *(self._fetch_media(u) for u in urls if u), return_exceptions=True
+        )
+        updated = dict(zip(filter(None, urls), local))
+
+        new: t.List[VisualMedia] = []
+        for m, url in zip(media, urls):
+            path = updated.get(url) if url else None
+            if path is None or isinstance(path, BaseException):
+                if path is not None:
+                    log.warning(f"failed to fetch media {url}: {path}")
+                new.append(m)
+            else:
+                new.append(self.media_cache.localize(m, path))
+
+        if all(a is b for a, b in zip(new, media)):
             return
+        # a new object, so that its fingerprint is computed from the new media
+        await self.feed_media_updated.emit(bid, replace(feed, media=new))
+
+    async def wait_media(self):
+        """Wait until media of dispatched feeds are fetched and :obj:`.feed_media_updated`
+        is emitted. See :obj:`.media_cache`.
+
+        .. versionadded:: 1.3.0
+        """
+        await self.ch_media.wait()
+        if self.media_cache is not None:
+            self.media_cache.save()
 
-        model.set_detail(feed)
-        self.ch_feed_notify.add_awaitable(self.feed_processed.emit(self.bid, model))
+    @property
+    def queue_depths(self) -> t.Dict[str, int]:
+        """Number of pending tasks in :obj:`._ch_feed_dispatch` (``dispatch``),
+        :obj:`.ch_feed_notify` (``notify``) and :obj:`.expand_executor` (``expand``).
+
+        .. versionadded:: 1.3.0
+        """
+        return dict(
+            dispatch=len(self._dispatching),
+            notify=len(self._notifying),
+            expand=self.expand_executor.queued + self.expand_executor.inflight,
+        )
+
+    @property
+    def memory_peak(self) -> t.Optional[int]:
+        """Peak size of memory blocks traced by :mod:`tracemalloc`, or None if it is not tracing.
+        Call :func:`tracemalloc.start` to enable it, which slows down the process.
+
+        .. versionadded:: 1.3.0
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        return tracemalloc.get_traced_memory()[1]
+
+    def _record_depths(self) -> None:
+        assert self.metrics
+        for k, v in self.queue_depths.items():
+            self.metrics.set_gauge(f"{k}_depth", v)
+        self.metrics.set_gauge("pending_peak", self.peak_pending)
+        if (peak := self.memory_peak) is not None:
+            self.metrics.set_gauge("memory_peak_bytes", peak)
+
+    @staticmethod
+    def _track(futs: t.Set[asyncio.Future], fut: asyncio.Future) -> asyncio.Future:
+        # FutureStore keeps its futures private, so pending ones are counted here
+        if not fut.done():
+            futs.add(fut)
+            fut.add_done_callback(futs.discard)
+        return fut
+
+    def _dispatch(self, aw: t.Awaitable) -> asyncio.Future:
+        return self._track(self._dispatching, self._ch_feed_dispatch.add_awaitable(aw))
+
+    def _notify(self, aw: t.Awaitable) -> asyncio.Future:
+        return self._track(self._notifying, self.ch_feed_notify.add_awaitable(aw))
+
+    def _pending(self) -> int:
+        return len(self._dispatching) + len(self._notifying)
+
+    async def _relieve(self, low: int) -> None:
+        """Wait until pending tasks in :obj:`._ch_feed_dispatch` and :obj:`.ch_feed_notify`
+        drop to `low`. See :obj:`.backpressure`.
+
+        .. versionadded:: 1.3.0
+        """
+        log.debug(f"fetching paused, {self._pending()} tasks pending")
+        if self.metrics:
+            self.metrics.inc("backpressure")
+        with timed(self.metrics, "backpressure"):
+            while True:
+                futs = self._dispatching | self._notifying
+                if len(futs) <= low:
+                    return
+                await asyncio.wait(futs, return_when=asyncio.FIRST_COMPLETED)
 
     async def wait(self):
         """Wait until all feeds are dispatched and emitted.
@@ -192,10 +1195,14 @@ class FeedH5Api(FeedApiEmitterMixin, HeartbeatApi):
         .. versionadded:: 1.2.1.dev1
         """
         await asyncio.gather(self._ch_feed_dispatch.wait(), self.ch_feed_notify.wait())
+        self.processed_batcher.flush()
         await self.ch_feed_notify.wait()
+        if self.store is not None:
+            self.store.flush()
 
     def stop(self) -> None:
         """Clear **all** registered tasks. All tasks will be CANCELLED if not finished."""
         log.warning("FeedApi stopping...")
+        self.processed_batcher.clear()
         FeedApiEmitterMixin.stop(self)
         HeartbeatApi.stop(self)
@@ -1,51 +1,300 @@
+import asyncio
 import logging
+import random
+import time
+import typing as t
+from enum import Enum
 
 from aiohttp.client_exceptions import ClientConnectorError, ClientResponseError, ServerTimeoutError
 from aioqzone.api.h5 import QzoneH5API
-from tenacity import RetryError
+from aioqzone.exception import QzoneError, UnexpectedLoginError
+from aioqzone.model.api import QzoneApi, TyRequest, TyResponse
+from qqqr.exception import TencentLoginError, UnexpectedInteraction
+from tenacity import RetryError, TryAgain
 
 from aioqzone_feed.message import HeartbeatEmitterMixin
+from aioqzone_feed.utils.metrics import Metrics, timed
 
 log = logging.getLogger(__name__)
 known_exc = (ClientResponseError, ServerTimeoutError)
+login_exc = (TencentLoginError, UnexpectedInteraction, UnexpectedLoginError, TryAgain)
+
+
+def is_login_error(exc: BaseException) -> bool:
+    """Tell if an exception raised by heartbeat means the login state is lost.
+
+    .. versionadded:: 1.3.0
+    """
+    if isinstance(exc, RetryError) and exc.last_attempt.failed:
+        exc = exc.last_attempt.exception()  # type: ignore
+    if isinstance(exc, QzoneError):
+        return exc.code in (-3000, -10000)
+    if isinstance(exc, ClientResponseError):
+        return exc.status in (302, 403)
+    return isinstance(exc, login_exc)
+
+
+class HeartbeatState(str, Enum):
+    """State of :class:`HeartbeatScheduler`.
+
+    .. versionadded:: 1.3.0
+    """
+
+    stopped = "stopped"
+    running = "running"
+    """Heartbeat succeeded last time."""
+    backoff = "backoff"
+    """Heartbeat failed last time, the next one is delayed."""
+    open = "open"
+    """Circuit is open because of repeated login failures. No heartbeat is sent."""
+    half_open = "half_open"
+    """Circuit open timeout. Next heartbeat is a probe."""
+
+
+class HeartbeatScheduler:
+    """Call :meth:`HeartbeatApi.heartbeat_refresh` periodically.
+
+    - The interval adapts to the rate of new feeds, so that about :obj:`.target_cnt` new feeds
+      arrive in each interval, bounded by [:obj:`.min_interval`, :obj:`.max_interval`];
+    - On failures, the interval grows exponentially with jitter, up to :obj:`.max_backoff`;
+    - After :obj:`.circuit_threshold` login failures in a row, the circuit opens and no heartbeat
+      is sent in :obj:`.circuit_timeout` seconds. Then a probe is sent to decide whether to close it.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(
+        self,
+        api: "HeartbeatApi",
+        *,
+        interval: float = 300,
+        min_interval: float = 60,
+        max_interval: float = 1200,
+        target_cnt: float = 5,
+        max_backoff: float = 3600,
+        jitter: float = 0.1,
+        circuit_threshold: int = 3,
+        circuit_timeout: float = 1800,
+    ) -> None:
+        assert 0 < min_interval <= interval <= max_interval
+        self.api = api
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_cnt = target_cnt
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.circuit_threshold = circuit_threshold
+        self.circuit_timeout = circuit_timeout
+
+        self.interval = interval
+        """Current interval between heartbeats, in seconds."""
+        self.state = HeartbeatState.stopped
+        self.failures = 0
+        """Number of failures in a row."""
+        self.login_failures = 0
+        """Number of login failures in a row."""
+        self.rate: t.Optional[float] = None
+        """Smoothed rate of new feeds, in feeds per second."""
+        self._last_cnt: t.Optional[int] = None
+        self._task: t.Optional[asyncio.Task] = None
+
+    def _jittered(self, delay: float) -> float:
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def update(self, result: t.Union[int, BaseException], elapsed: float) -> float:
+        """Update the state with the result of a heartbeat.
+
+        The first succeeded result only seeds the count, since `active_cnt` includes all
+        feeds before it, not those in `elapsed`.
+
+        :param result: return value of :meth:`HeartbeatApi.heartbeat_refresh`.
+        :param elapsed: seconds since the last heartbeat.
+        :return: seconds to wait before the next heartbeat.
+        """
+        if isinstance(result, BaseException):
+            self.failures += 1
+            if is_login_error(result):
+                self.login_failures += 1
+            if self.state is HeartbeatState.half_open or (
+                self.login_failures >= self.circuit_threshold
+            ):
+                log.warning("heartbeat circuit open due to login failures")
+                self.state = HeartbeatState.open
+                return self.circuit_timeout
+
+            self.state = HeartbeatState.backoff
+            backoff = min(self.interval * 2 ** (self.failures - 1), self.max_backoff)
+            return self._jittered(backoff)
+
+        self.failures = self.login_failures = 0
+        self.state = HeartbeatState.running
+
+        if self._last_cnt is None:
+            self._last_cnt = result
+            return self._jittered(self.interval)
+
+        # active_cnt is accumulated until feeds are fetched. Use its increment as new feeds.
+        new = result - self._last_cnt if result >= self._last_cnt else result
+        self._last_cnt = result
+        rate = new / max(elapsed, 1e-3)
+        self.rate = rate if self.rate is None else 0.5 * self.rate + 0.5 * rate
+
+        if self.rate > 0:
+            interval = self.target_cnt / self.rate
+        else:
+            interval = self.interval * 1.5
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        return self._jittered(self.interval)
+
+    async def _run(self, initial_delay: float):
+        try:
+            await asyncio.sleep(initial_delay)
+            last = time.monotonic()
+            while True:
+                if self.state is HeartbeatState.open:
+                    self.state = HeartbeatState.half_open
+                result = await self.api.heartbeat_refresh()
+                now = time.monotonic()
+                delay = self.update(result, now - last)
+                last = now
+                log.debug("next heartbeat in %.1fs (%s)", delay, self.state.value)
+                await asyncio.sleep(delay)
+        finally:
+            # not restarted in the meantime
+            if self._task is None or self._task is asyncio.current_task():
+                self.state = HeartbeatState.stopped
+
+    def start(self, initial_delay: float = 0) -> None:
+        """Start scheduling heartbeats.
+
+        :param initial_delay: seconds to wait before the first heartbeat.
+        """
+        if self._task is None or self._task.done():
+            self.state = HeartbeatState.running
+            self._task = asyncio.ensure_future(self._run(initial_delay))
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.state = HeartbeatState.stopped
 
 
 class HeartbeatApi(HeartbeatEmitterMixin, QzoneH5API):
-    async def heartbeat_refresh(self) -> None:
+    limiter: t.Optional[t.AsyncContextManager] = None
+    """If set, every Qzone api call is made within this context manager, e.g. an
+    :class:`asyncio.Semaphore` to limit concurrent requests.
+
+    .. versionadded:: 1.3.0
+    """
+    metrics: t.Optional[Metrics] = None
+    """If set, counters, latencies and queue depths of each stage are recorded into it.
+
+    .. versionadded:: 1.3.0
+    """
+    hb_scheduler: t.Optional[HeartbeatScheduler] = None
+    """The scheduler created by :meth:`.start_heartbeat`.
+
+    .. versionadded:: 1.3.0
+    """
+
+    async def call(self, api: QzoneApi[TyRequest, TyResponse]) -> TyResponse:
+        if self.limiter is None:
+            return await super().call(api)
+        async with self.limiter:
+            return await super().call(api)
+
+    async def heartbeat_refresh(self) -> t.Union[int, BaseException]:
         """A wrapper function that calls :obj:`hb_api` and handles all kinds of excpetions
         raised during heartbeat.
 
         .. note::
             This method calls heartbeat **ONLY ONCE** so it should be called periodically by using
-            other timer/scheduler.
+            other timer/scheduler, or use :meth:`.start_heartbeat`.
+
+        :return: `active_cnt` if succeeded, else the exception.
 
         .. versionchanged:: 0.13.4
 
             do not retry, just call heartbeat once
+
+        .. versionchanged:: 1.3.0
+
+            return the result
         """
+        with timed(self.metrics, "heartbeat"):
+            r = await self._heartbeat_refresh()
+        if self.metrics and isinstance(r, BaseException):
+            self.metrics.inc("heartbeat_failed")
+        return r
 
+    async def _heartbeat_refresh(self) -> t.Union[int, BaseException]:
         try:
             cnt = (await self.mfeeds_get_count()).active_cnt
             log.debug("heartbeat: active_cnt=%d", cnt)
             if cnt > 0:
                 self.ch_heartbeat_notify.add_awaitable(self.hb_refresh.emit(cnt))
-            return
+            return cnt
         except ClientConnectorError as e:
             log.warning("网络连接较差，或许可以稍后再试。")
             self.ch_heartbeat_notify.add_awaitable(self.hb_failed.emit(e))
+            return e
         except RetryError as e:
             if e.last_attempt.failed:
                 e = e.last_attempt.exception()
             log.warning(e)
             self.ch_heartbeat_notify.add_awaitable(self.hb_failed.emit(e))
+            return e  # type: ignore
         except known_exc as e:
             log.warning(e)
             self.ch_heartbeat_notify.add_awaitable(self.hb_failed.emit(e))
+            return e
+        except asyncio.CancelledError:
+            raise
         except BaseException as e:
             log.error("心跳出现未捕获的异常", exc_info=e)
             self.ch_heartbeat_notify.add_awaitable(self.hb_failed.emit(e))
+            return e
+
+    def start_heartbeat(self, initial_delay: float = 0, **kwds) -> HeartbeatScheduler:
+        """Start an adaptive heartbeat scheduler. If there is one running, it will be stopped.
+
+        :param initial_delay: seconds to wait before the first heartbeat.
+        :param kwds: arguments passed to :class:`HeartbeatScheduler`.
+
+        .. versionadded:: 1.3.0
+        """
+        self.stop_heartbeat()
+        self.hb_scheduler = HeartbeatScheduler(self, **kwds)
+        self.hb_scheduler.start(initial_delay)
+        return self.hb_scheduler
+
+    def stop_heartbeat(self) -> None:
+        """Stop the heartbeat scheduler if any.
+
+        .. versionadded:: 1.3.0
+        """
+        if self.hb_scheduler:
+            self.hb_scheduler.stop()
+
+    @property
+    def hb_interval(self) -> t.Optional[float]:
+        """Current heartbeat interval, None if no scheduler is started.
+
+        .. versionadded:: 1.3.0
+        """
+        return self.hb_scheduler.interval if self.hb_scheduler else None
+
+    @property
+    def hb_state(self) -> HeartbeatState:
+        """Current heartbeat state.
+
+        .. versionadded:: 1.3.0
+        """
+        return self.hb_scheduler.state if self.hb_scheduler else HeartbeatState.stopped
 
     def stop(self) -> None:
         """Clear **all** registered tasks. All tasks will be CANCELLED if not finished."""
         log.warning("HeartbeatApi stopping...")
+        self.stop_heartbeat()
         super().stop()
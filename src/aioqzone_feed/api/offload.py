@@ -0,0 +1,95 @@
+"""Parse feed pages out of the event loop.
+
+Validating a large page and converting its feeds cost much cpu time, which stalls other
+coroutines in the same loop, e.g. heartbeats. With the apis here, :meth:`QzoneH5API.call`
+returns the raw response body, which is then parsed and converted by :func:`parse_page` in an
+executor. Everything passed to and returned from :func:`parse_page` can be pickled, so it
+works with both thread pools and process pools.
+
+.. versionadded:: 1.3.0
+"""
+import json
+import logging
+import typing as t
+
+from aioqzone.exception import QzoneError
+from aioqzone.model.api import (
+    ActiveFeedsParams,
+    FeedPageApi,
+    FeedPageResp,
+    GetFeedsApi,
+    GetFeedsParams,
+    ProfileResp,
+)
+
+from aioqzone_feed.type import FeedContent
+
+log = logging.getLogger(__name__)
+
+__all__ = ["ParsedPage", "RawFeedPageApi", "RawGetFeedsApi", "raw_page_api", "parse_page"]
+
+
+class _RawResponse:
+    """Plays the role of a response model in :meth:`QzoneH5API.call`, but keeps the body."""
+
+    @classmethod
+    async def response_to_object(cls, response) -> bytes:
+        return await response.read()
+
+    @classmethod
+    def from_response_object(cls, obj: bytes) -> bytes:
+        return obj
+
+
+class RawFeedPageApi(FeedPageApi):
+    response: t.ClassVar = _RawResponse
+
+
+class RawGetFeedsApi(GetFeedsApi):
+    response: t.ClassVar = _RawResponse
+
+
+def raw_page_api(
+    uin: t.Optional[int], attach_info: str
+) -> t.Union[RawFeedPageApi, RawGetFeedsApi]:
+    """The api to get the page after `attach_info`, of the active feeds if `uin` is not given,
+    or of the profile of `uin`. The page must not be the first one, which is an html page."""
+    if uin:
+        return RawGetFeedsApi(params=GetFeedsParams(hostuin=uin, attach_info=attach_info))
+    return RawFeedPageApi(params=ActiveFeedsParams(attach_info=attach_info))
+
+
+class ParsedPage(t.NamedTuple):
+    page: FeedPageResp
+    models: t.List[t.Optional[FeedContent]]
+    """Converted feeds of :obj:`.page`, with details set. Feeds with `hasmore` flag are None,
+    since they will be replaced by their full contents."""
+
+
+def parse_page(data: bytes, profile: bool = False) -> t.Union[ParsedPage, t.Tuple[int, str]]:
+    """Parse a page body returned by :func:`raw_page_api`, and convert its feeds.
+
+    :param profile: if the page is of a profile.
+    :return: the parsed page. If Qzone returns an error, ``(code, message)`` of it, since
+        :external:class:`aioqzone.exception.QzoneError` cannot be pickled.
+    """
+    cls = ProfileResp if profile else FeedPageResp
+    try:
+        page = cls.from_response_object(json.loads(data))
+    except QzoneError as e:
+        return e.code, e.msg
+
+    models: t.List[t.Optional[FeedContent]] = []
+    for feed in page.vFeeds:
+        if feed.summary.hasmore:
+            models.append(None)
+            continue
+        try:
+            model = FeedContent.from_feed(feed)
+            model.set_detail(feed)
+        except Exception:
+            # let it be converted, and fail, in the loop as usual
+            log.debug(f"failed to convert {feed.fid}", exc_info=True)
+            model = None
+        models.append(model)
+    return ParsedPage(page, models)
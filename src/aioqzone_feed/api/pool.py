@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import typing as t
+
+from aioqzone.api import Loginable
+from qqqr.utils.net import ClientAdapter
+from tylisten.futstore import FutureStore
+
+from aioqzone_feed.api.feed import FeedH5Api
+from aioqzone_feed.message.feed import tagged_feed
+
+log = logging.getLogger(__name__)
+
+__all__ = ["FeedApiPool"]
+
+
+class _Limiter:
+    """Acquire several semaphores in order, and release them in reverse order."""
+
+    __slots__ = ("sems",)
+
+    def __init__(self, *sems: asyncio.Semaphore) -> None:
+        self.sems = sems
+
+    async def __aenter__(self):
+        acquired = []
+        try:
+            for sem in self.sems:
+                await sem.acquire()
+                acquired.append(sem)
+        except BaseException:
+            for sem in reversed(acquired):
+                sem.release()
+            raise
+
+    async def __aexit__(self, *exc):
+        for sem in reversed(self.sems):
+            sem.release()
+
+
+class FeedApiPool:
+    """Manage many :class:`.FeedH5Api` instances which share one http session.
+
+    - Requests are limited by a global and a per-account concurrency limit;
+    - Heartbeats of all accounts are staggered over :obj:`.hb_interval`;
+    - Feeds processed by any account are emitted through :obj:`.feed_processed` with its uin.
+
+    .. warning::
+
+        Since cookies are passed per request, the shared session should not keep response
+        cookies, i.e. create it with ``ClientSession(cookie_jar=aiohttp.DummyCookieJar())``.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(
+        self,
+        client: ClientAdapter,
+        *,
+        max_concurrency: int = 16,
+        per_account: int = 2,
+        hb_interval: float = 300,
+    ) -> None:
+        """
+        :param client: the shared http session.
+        :param max_concurrency: max concurrent requests of all accounts.
+        :param per_account: max concurrent requests of each account.
+        :param hb_interval: interval of each account's heartbeat, in seconds.
+        """
+        self.client = client
+        self.per_account = per_account
+        self.hb_interval = hb_interval
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._hb_task: t.Optional[asyncio.Task] = None
+        self._tags: t.Dict[int, t.Callable] = {}
+
+        self.apis: t.Dict[int, FeedH5Api] = {}
+        """Managed apis, keyed by login uin."""
+        self.feed_processed = tagged_feed()
+        """This emitter is triggered when a feed is processed by any managed api."""
+        self.ch_heartbeat = FutureStore()
+        """A future store serves as heartbeat channel."""
+
+    def __len__(self) -> int:
+        return len(self.apis)
+
+    def add(
+        self, loginman: Loginable, api_cls: t.Type[FeedH5Api] = FeedH5Api, **kwds
+    ) -> FeedH5Api:
+        """Create an api for the given login manager and manage it.
+
+        :param loginman: login manager of the account.
+        :param api_cls: subclass of :class:`.FeedH5Api` to create.
+        :param kwds: other keyword arguments passed to `api_cls`.
+        :return: the created api.
+        """
+        uin = loginman.uin
+        assert uin not in self.apis, f"{uin} is already in the pool"
+
+        api = api_cls(self.client, loginman, **kwds)
+        api.limiter = _Limiter(asyncio.Semaphore(self.per_account), self._sem)
+        tag = self._tags[uin] = lambda bid, feed: self.feed_processed.emit(uin, bid, feed)
+        api.feed_processed.add_impl(tag)
+        self.apis[uin] = api
+        return api
+
+    def remove(self, uin: int) -> FeedH5Api:
+        """Stop and remove an api from the pool. Its feeds are no longer emitted by the pool."""
+        api = self.apis.pop(uin)
+        api.feed_processed.impls.remove(self._tags.pop(uin))
+        api.stop()
+        return api
+
+    async def _heartbeat_loop(self):
+        while True:
+            if not self.apis:
+                await asyncio.sleep(self.hb_interval)
+                continue
+            # send one heartbeat at a time, evenly spread over the interval
+            for uin, api in list(self.apis.items()):
+                await asyncio.sleep(self.hb_interval / max(len(self.apis), 1))
+                if self.apis.get(uin) is api:
+                    self.ch_heartbeat.add_awaitable(api.heartbeat_refresh())
+
+    def start_heartbeat(self, adaptive: bool = False, **kwds) -> None:
+        """Start sending staggered heartbeats for all managed apis.
+
+        :param adaptive: use an adaptive :class:`.HeartbeatScheduler` for each api, whose first
+            heartbeats are staggered. Otherwise heartbeats are sent one by one by the pool.
+        :param kwds: arguments passed to :meth:`.HeartbeatApi.start_heartbeat` if `adaptive`.
+        """
+        if adaptive:
+            kwds.setdefault("interval", self.hb_interval)
+            step = self.hb_interval / max(len(self.apis), 1)
+            for i, api in enumerate(self.apis.values()):
+                api.start_heartbeat(initial_delay=i * step, **kwds)
+            return
+
+        if self._hb_task is None or self._hb_task.done():
+            self._hb_task = asyncio.ensure_future(self._heartbeat_loop())
+
+    def stop_heartbeat(self) -> None:
+        if self._hb_task:
+            self._hb_task.cancel()
+            self._hb_task = None
+        for api in self.apis.values():
+            api.stop_heartbeat()
+
+    async def wait(self):
+        """Wait until all managed apis have dispatched and emitted their feeds."""
+        await asyncio.gather(*(api.wait() for api in self.apis.values()))
+
+    def stop(self) -> None:
+        """Stop heartbeats and all managed apis."""
+        self.stop_heartbeat()
+        self.ch_heartbeat.clear()
+        for api in self.apis.values():
+            api.stop()
@@ -0,0 +1,361 @@
+"""A compact binary format of feeds, for passing feeds between processes.
+
+A buffer holds a batch of feeds. It starts with a header and an offset table, so that each
+feed can be read on its own by :class:`FeedView` without decoding others:
+
+.. code-block:: none
+
+    header   := b"QZF" version:u8 count:u32
+    offsets  := offset:u32 * count        # from the start of the buffer
+    feed     := kind:u8 appid:u32 typeid:u32 abstime:i64 uin:i64 islike:u8
+                fid nickname curkey unikey topicId    # str
+                [entities forward media fingerprint]  # only if kind is FeedContent
+    str      := length:u32 utf8 | 0xffffffff           # None
+    entities := count:u16 (type:u8 fields)*
+    forward  := 0 | 1 str | 2 feed
+    media    := count:u16 (height:u32 width:u32 is_video:u8 raw:str thumbnail:str)*
+    fingerprint := str                    # None if it is not computed yet
+
+All integers are little-endian. A computed fingerprint is kept as is, since it may be of the
+untranslated entities, see :obj:`.FeedContent.fingerprint`.
+
+.. code-block:: python
+
+    buf = encode_batch(feeds)  # send it to another process
+    for view in BatchView(buf):
+        if view.uin in interested:
+            feed = view.to_feed()
+
+.. versionadded:: 1.3.0
+"""
+
+import struct
+import typing as t
+
+from aioqzone.model import AtEntity, ConEntity, EmEntity, LinkEntity, TextEntity
+
+from aioqzone_feed.type import BaseFeed, FeedContent, VisualMedia
+
+__all__ = ["VERSION", "encode", "decode", "encode_batch", "decode_batch", "BatchView", "FeedView"]
+
+VERSION = 1
+MAGIC = b"QZF"
+
+_HEADER = struct.Struct("<3sBI")
+_U32 = struct.Struct("<I")
+_U16 = struct.Struct("<H")
+_FIXED = struct.Struct("<BIIqqB")
+_MEDIA = struct.Struct("<IIB")
+_NONE = 0xFFFFFFFF
+
+_BASE, _CONTENT = 0, 1
+_TEXT, _AT, _EM, _LINK = 0, 1, 2, 3
+_FWD_NONE, _FWD_STR, _FWD_FEED = 0, 1, 2
+_STR_FIELDS = ("fid", "nickname", "curkey", "unikey", "topicId")
+
+
+def _put_str(out: bytearray, s: t.Optional[str]) -> None:
+    if s is None:
+        out += _U32.pack(_NONE)
+        return
+    b = s.encode()
+    out += _U32.pack(len(b))
+    out += b
+
+
+def _get_str(buf: memoryview, pos: int) -> t.Tuple[t.Optional[str], int]:
+    (n,) = _U32.unpack_from(buf, pos)
+    pos += 4
+    if n == _NONE:
+        return None, pos
+    return str(buf[pos : pos + n], "utf8"), pos + n
+
+
+def _skip_str(buf: memoryview, pos: int) -> int:
+    (n,) = _U32.unpack_from(buf, pos)
+    return pos + 4 if n == _NONE else pos + 4 + n
+
+
+def _put_entity(out: bytearray, e: ConEntity) -> None:
+    if isinstance(e, AtEntity):
+        out.append(_AT)
+        out += struct.pack("<q", e.uin)
+        _put_str(out, e.nick)
+    elif isinstance(e, EmEntity):
+        out.append(_EM)
+        out += _U32.pack(e.eid)
+    elif isinstance(e, LinkEntity):
+        out.append(_LINK)
+        _put_str(out, str(e.url))
+        _put_str(out, e.text)
+    else:
+        out.append(_TEXT)
+        _put_str(out, getattr(e, "con", ""))
+
+
+_E = t.TypeVar("_E", bound=ConEntity)
+
+
+def _construct(cls: t.Type[_E], values: t.Dict[str, t.Any]) -> _E:
+    # the same way as unpickling, much cheaper than `model_construct`
+    e = cls.__new__(cls)
+    e.__setstate__(
+        {
+            "__dict__": values,
+            "__pydantic_fields_set__": set(values),
+            "__pydantic_extra__": None,
+            "__pydantic_private__": None,
+        }
+    )
+    return e
+
+
+def _get_entity(buf: memoryview, pos: int) -> t.Tuple[ConEntity, int]:
+    kind = buf[pos]
+    pos += 1
+    if kind == _AT:
+        (uin,) = struct.unpack_from("<q", buf, pos)
+        nick, pos = _get_str(buf, pos + 8)
+        return _construct(AtEntity, dict(uin=uin, nick=nick)), pos
+    if kind == _EM:
+        (eid,) = _U32.unpack_from(buf, pos)
+        return _construct(EmEntity, dict(eid=eid)), pos + 4
+    if kind == _LINK:
+        url, pos = _get_str(buf, pos)
+        text, pos = _get_str(buf, pos)
+        return _construct(LinkEntity, dict(url=url, text=text)), pos
+    con, pos = _get_str(buf, pos)
+    return _construct(TextEntity, dict(con=con)), pos
+
+
+def _put_feed(out: bytearray, feed: BaseFeed) -> None:
+    is_content = isinstance(feed, FeedContent)
+    out += _FIXED.pack(
+        _CONTENT if is_content else _BASE,
+        feed.appid,
+        feed.typeid,
+        feed.abstime,
+        feed.uin,
+        feed.islike,
+    )
+    for name in _STR_FIELDS:
+        _put_str(out, getattr(feed, name))
+    if not is_content:
+        return
+
+    assert isinstance(feed, FeedContent)
+    out += _U16.pack(len(feed.entities))
+    for e in feed.entities:
+        _put_entity(out, e)
+
+    if feed.forward is None:
+        out.append(_FWD_NONE)
+    elif isinstance(feed.forward, FeedContent):
+        out.append(_FWD_FEED)
+        _put_feed(out, feed.forward)
+    else:
+        out.append(_FWD_STR)
+        _put_str(out, feed.forward)
+
+    out += _U16.pack(len(feed.media))
+    for m in feed.media:
+        out += _MEDIA.pack(m.height, m.width, m.is_video)
+        _put_str(out, m.raw)
+        _put_str(out, m.thumbnail)
+    _put_str(out, getattr(feed, "_fp", None))
+
+
+def _get_feed(buf: memoryview, pos: int) -> t.Tuple[BaseFeed, int]:
+    kind, appid, typeid, abstime, uin, islike = _FIXED.unpack_from(buf, pos)
+    pos += _FIXED.size
+    strs = []
+    for _ in _STR_FIELDS:
+        s, pos = _get_str(buf, pos)
+        strs.append(s)
+    fid, nickname, curkey, unikey, topicId = strs
+    base = dict(
+        appid=appid,
+        typeid=typeid,
+        fid=fid,
+        abstime=abstime,
+        uin=uin,
+        nickname=nickname,
+        curkey=curkey,
+        unikey=unikey,
+        topicId=topicId,
+        islike=bool(islike),
+    )
+    if kind == _BASE:
+        return BaseFeed(**base), pos
+
+    (n,) = _U16.unpack_from(buf, pos)
+    pos += 2
+    entities = []
+    for _ in range(n):
+        e, pos = _get_entity(buf, pos)
+        entities.append(e)
+
+    tag = buf[pos]
+    pos += 1
+    forward: t.Union[FeedContent, str, None] = None
+    if tag == _FWD_FEED:
+        forward, pos = _get_feed(buf, pos)  # type: ignore
+    elif tag == _FWD_STR:
+        forward, pos = _get_str(buf, pos)
+
+    (n,) = _U16.unpack_from(buf, pos)
+    pos += 2
+    media = []
+    for _ in range(n):
+        height, width, is_video = _MEDIA.unpack_from(buf, pos)
+        raw, pos = _get_str(buf, pos + _MEDIA.size)
+        thumbnail, pos = _get_str(buf, pos)
+        media.append(VisualMedia(height, width, raw, bool(is_video), thumbnail))  # type: ignore
+
+    feed = FeedContent(entities=entities, forward=forward, media=media, **base)
+    fp, pos = _get_str(buf, pos)
+    if fp is not None:
+        feed._fp = fp
+    return feed, pos
+
+
+def encode_batch(feeds: t.Sequence[BaseFeed]) -> bytes:
+    """Encode feeds, e.g. a page, into one buffer."""
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, len(feeds)))
+    table = len(out)
+    out += bytes(4 * len(feeds))
+    for i, feed in enumerate(feeds):
+        _U32.pack_into(out, table + 4 * i, len(out))
+        _put_feed(out, feed)
+    return bytes(out)
+
+
+def _check_header(buf: memoryview) -> int:
+    if len(buf) < _HEADER.size:
+        raise ValueError("buffer too short")
+    magic, version, count = _HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError("not a feed buffer")
+    if version != VERSION:
+        raise ValueError(f"unsupported version: {version}")
+    return count
+
+
+def decode_batch(buf: t.Union[bytes, bytearray, memoryview]) -> t.List[BaseFeed]:
+    """Decode all feeds in a buffer made by :func:`encode_batch`.
+
+    :raise `ValueError`: if the buffer is not of a supported version.
+    """
+    return [view.to_feed() for view in BatchView(buf)]
+
+
+def encode(feed: BaseFeed) -> bytes:
+    """Encode a feed. Same as ``encode_batch([feed])``."""
+    return encode_batch([feed])
+
+
+def decode(buf: t.Union[bytes, bytearray, memoryview]) -> BaseFeed:
+    """Decode a buffer made by :func:`encode`."""
+    return BatchView(buf)[0].to_feed()
+
+
+class FeedView:
+    """Read fields of an encoded feed without decoding the whole feed. Numeric fields are read
+    directly from the buffer; string fields are decoded on access.
+
+    .. versionadded:: 1.3.0
+    """
+
+    __slots__ = ("_buf", "_pos", "_fixed")
+
+    def __init__(self, buf: memoryview, pos: int) -> None:
+        self._buf = buf
+        self._pos = pos
+        self._fixed = _FIXED.unpack_from(buf, pos)
+
+    @property
+    def is_content(self) -> bool:
+        return self._fixed[0] == _CONTENT
+
+    @property
+    def appid(self) -> int:
+        return self._fixed[1]
+
+    @property
+    def typeid(self) -> int:
+        return self._fixed[2]
+
+    @property
+    def abstime(self) -> int:
+        return self._fixed[3]
+
+    @property
+    def uin(self) -> int:
+        return self._fixed[4]
+
+    @property
+    def islike(self) -> bool:
+        return bool(self._fixed[5])
+
+    def _str(self, idx: int) -> t.Optional[str]:
+        pos = self._pos + _FIXED.size
+        for _ in range(idx):
+            pos = _skip_str(self._buf, pos)
+        return _get_str(self._buf, pos)[0]
+
+    @property
+    def fid(self) -> str:
+        return self._str(0)  # type: ignore
+
+    @property
+    def nickname(self) -> str:
+        return self._str(1)  # type: ignore
+
+    @property
+    def curkey(self) -> t.Optional[str]:
+        return self._str(2)
+
+    @property
+    def unikey(self) -> t.Optional[str]:
+        return self._str(3)
+
+    @property
+    def topicId(self) -> str:
+        return self._str(4)  # type: ignore
+
+    def to_feed(self) -> BaseFeed:
+        """Decode the whole feed."""
+        return _get_feed(self._buf, self._pos)[0]
+
+
+class BatchView(t.Sequence[FeedView]):
+    """A read-only sequence of :class:`FeedView` on a buffer made by :func:`encode_batch`.
+    The buffer is not copied.
+
+    :raise `ValueError`: if the buffer is not of a supported version.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(self, buf: t.Union[bytes, bytearray, memoryview]) -> None:
+        self._buf = memoryview(buf)
+        self._count = _check_header(self._buf)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @t.overload
+    def __getitem__(self, idx: int) -> FeedView: ...
+
+    @t.overload
+    def __getitem__(self, idx: slice) -> t.List[FeedView]: ...
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._count))]
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError(idx)
+        (pos,) = _U32.unpack_from(self._buf, _HEADER.size + 4 * idx)
+        return FeedView(self._buf, pos)
@@ -5,7 +5,19 @@ from tylisten.futstore import FutureStore
 
 from aioqzone_feed.type import FEED_TYPES, BaseFeed, FeedContent
 
-__all__ = ["raw_feed", "processed_feed", "stop_fetch", "FeedApiEmitterMixin"]
+__all__ = [
+    "raw_feed",
+    "processed_feed",
+    "processed_batch",
+    "skipped_feed",
+    "expand_failed",
+    "crawl_failed",
+    "edited_feed",
+    "stop_fetch",
+    "stop_fetch_page",
+    "tagged_feed",
+    "FeedApiEmitterMixin",
+]
 
 
 @hookdef
@@ -24,12 +36,90 @@ def processed_feed(bid: int, feed: FeedContent) -> t.Any:
     """
 
 
+@hookdef
+def processed_batch(bid: int, feeds: t.List[FeedContent]) -> t.Any:
+    """
+    :param bid: Used to identify feed batch (tell from different calling).
+    :param feeds: processed feeds of this batch, in the order they are processed.
+
+    .. versionadded:: 1.3.0
+    """
+
+
+@hookdef
+def skipped_feed(bid: int, feed: FEED_TYPES) -> t.Any:
+    """
+    :param bid: Used to identify feed batch (tell from different calling).
+    :param feed: The raw feed which has been seen before. No model is built for it.
+
+    .. versionadded:: 1.3.0
+    """
+
+
+@hookdef
+def expand_failed(bid: int, feed: FEED_TYPES, exc: BaseException) -> t.Any:
+    """
+    :param bid: Used to identify feed batch (tell from different calling).
+    :param feed: The raw feed whose full content cannot be fetched. It will be dispatched as is.
+    :param exc: The exception raised when fetching the full content.
+
+    .. versionadded:: 1.3.0
+    """
+
+
+@hookdef
+def crawl_failed(uin: int, exc: BaseException) -> t.Any:
+    """
+    :param uin: The user whose profile cannot be crawled. The feeds got before are kept.
+    :param exc: The exception raised when crawling.
+
+    .. versionadded:: 1.3.0
+    """
+
+
+@hookdef
+def edited_feed(bid: int, feed: FeedContent, old_fingerprint: str) -> t.Any:
+    """
+    :param bid: Used to identify feed batch (tell from different calling).
+    :param feed: The feed whose content differs from the one got before.
+    :param old_fingerprint: :obj:`~aioqzone_feed.type.FeedContent.fingerprint` of the content
+        got before.
+
+    .. versionadded:: 1.3.0
+    """
+
+
 @hookdef
 def stop_fetch(feed: FEED_TYPES) -> bool:
     """An async callback to determine if fetch should be stopped (after processing current batch)."""
     return False
 
 
+@hookdef
+def stop_fetch_page(feeds: t.List[FEED_TYPES]) -> t.Optional[int]:
+    """A page-level version of :obj:`stop_fetch`. It is called once per page, so that
+    implements can check all feeds in one batch, e.g. one database query.
+
+    :param feeds: all feeds in the page.
+    :return: index of the first feed to stop at. Feeds from this index are treated as if
+        :obj:`stop_fetch` returns True. None means no stop.
+
+    .. versionadded:: 1.3.0
+    """
+    return None
+
+
+@hookdef
+def tagged_feed(uin: int, bid: int, feed: FeedContent) -> t.Any:
+    """
+    :param uin: Login uin of the account which got this feed.
+    :param bid: Used to identify feed batch (tell from different calling).
+    :param feed: Used to pass the feed content.
+
+    .. versionadded:: 1.3.0
+    """
+
+
 class FeedApiEmitterMixin:
     def __init__(self, *args, **kwds) -> None:
         super().__init__(*args, **kwds)
@@ -37,16 +127,62 @@ class FeedApiEmitterMixin:
         """This emitter is triggered when a feed is dropped."""
         self.feed_processed = processed_feed()
         """This emitter is triggered when a feed is processed."""
+        self.feed_processed_batch = processed_batch()
+        """This emitter is triggered with a list of processed feeds, which suits bulk operations
+        such as database inserts. See :obj:`.FeedH5Api.processed_batcher` for how feeds are
+        batched. It is independent of :obj:`.feed_processed`, a feed is passed to both if both
+        have implements.
+
+        .. versionadded:: 1.3.0
+        """
         self.feed_media_updated = processed_feed()
-        """This emitter is triggered when a feed's media is updated."""
+        """This emitter is triggered when a feed's media is updated.
+
+        .. versionchanged:: 1.3.0
+
+            emitted when media are cached locally, see :obj:`.FeedH5Api.media_cache`.
+        """
+        self.feed_skipped = skipped_feed()
+        """This emitter is triggered when a feed is skipped since it has been seen before.
+
+        .. versionadded:: 1.3.0
+        """
+        self.feed_expand_failed = expand_failed()
+        """This emitter is triggered when the full content of a feed cannot be fetched.
+
+        .. versionadded:: 1.3.0
+        """
+        self.feed_crawl_failed = crawl_failed()
+        """This emitter is triggered when a profile in :meth:`.FeedH5Api.iter_feeds_by_uins`
+        fails to be crawled, which is skipped then.
+
+        .. versionadded:: 1.3.0
+        """
+        self.feed_edited = edited_feed()
+        """This emitter is triggered when a known feed is got again with its content changed.
+
+        .. versionadded:: 1.3.0
+        """
         self.stop_fetch = stop_fetch()
         """This hook is used to determin whether a fetch should stop."""
+        self.stop_fetch_page = stop_fetch_page()
+        """This hook is used to determin where a fetch should stop in a page.
+        All implements are called concurrently.
+
+        .. versionadded:: 1.3.0
+        """
         self._ch_feed_dispatch = FutureStore()
         """An internal future store serves as feed dispatch channel."""
         self.ch_feed_notify = FutureStore()
         """A future store serves as message notify channel."""
+        self.ch_media = FutureStore()
+        """A future store serves as media fetching channel.
+
+        .. versionadded:: 1.3.0
+        """
 
     def stop(self):
         """Clear future stores."""
         self._ch_feed_dispatch.clear()
         self.ch_feed_notify.clear()
+        self.ch_media.clear()
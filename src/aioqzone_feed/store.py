@@ -0,0 +1,299 @@
+"""A local feed store based on sqlite.
+
+.. versionadded:: 1.3.0
+"""
+import json
+import logging
+import sqlite3
+import typing as t
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from aioqzone.model import AtEntity, ConEntity, EmEntity, LinkEntity, TextEntity
+
+from aioqzone_feed.type import FeedContent, VisualMedia
+
+log = logging.getLogger(__name__)
+
+__all__ = ["FeedStore", "CrawlState", "CrawlCursor"]
+
+_ENTITY_TYPES: t.Dict[str, t.Type[ConEntity]] = {
+    c.__name__: c for c in (TextEntity, AtEntity, EmEntity, LinkEntity)
+}
+_FEED_COLUMNS = (
+    "uin",
+    "abstime",
+    "appid",
+    "typeid",
+    "fid",
+    "nickname",
+    "curkey",
+    "unikey",
+    "topicId",
+    "islike",
+)
+
+
+class CrawlState(t.NamedTuple):
+    """Crawl state of an account on a host."""
+
+    attach_info: t.Optional[str] = None
+    """``attach_info`` of the next page of an unfinished crawl. None if the last crawl is finished."""
+    watermark: t.Optional[t.Tuple[int, int]] = None
+    """The high-water mark, see :obj:`.FeedH5Api.watermarks`."""
+    pending: t.Optional[t.Tuple[int, int]] = None
+    """The newest ``(abstime, uin)`` got by the unfinished crawl."""
+
+
+@dataclass
+class CrawlCursor:
+    """Progress of a crawl started by :meth:`.FeedH5Api.get_feeds_by_second` or
+    :meth:`.FeedH5Api.get_feeds_by_count`, updated once a page is dispatched. Pass it to
+    the same method again to resume an interrupted crawl from the page after the last
+    dispatched one.
+
+    .. code-block:: python
+
+        cursor = CrawlCursor()
+        while not cursor.done:
+            try:
+                await api.get_feeds_by_second(3 * 86400, cursor=cursor)
+            except RetryError:
+                save(cursor.to_dict())
+                await asyncio.sleep(60)
+
+    .. versionadded:: 1.3.0
+    """
+
+    uin: t.Optional[int] = None
+    """Host uin of the crawl, None for the active feeds."""
+    attach_info: str = ""
+    """``attach_info`` of the next page."""
+    count: int = 0
+    """Number of feeds got so far."""
+    bid: int = 0
+    """Batch id of the crawl, which is kept by the feeds of the resumed crawl."""
+    start: t.Optional[float] = None
+    """Newest timestamp of the time window."""
+    end: t.Optional[float] = None
+    """Oldest timestamp of the time window."""
+    limit: t.Optional[int] = None
+    """Max number of feeds to get."""
+    done: bool = False
+    """If the crawl is finished. A finished cursor gets nothing."""
+
+    @property
+    def started(self) -> bool:
+        """If the crawl window is set by a call."""
+        return self.end is not None or self.limit is not None
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        """A json serializable dict, which can be passed to :meth:`.from_dict`."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: t.Dict[str, t.Any]):
+        return cls(**d)
+
+
+def _dump_detail(feed: FeedContent) -> t.Dict[str, t.Any]:
+    if isinstance(feed.forward, FeedContent):
+        forward = {c: getattr(feed.forward, c) for c in _FEED_COLUMNS}
+        forward.update(_dump_detail(feed.forward))
+    else:
+        forward = feed.forward
+    detail = dict(
+        entities=[
+            dict(type=e.__class__.__name__, **e.model_dump(mode="json")) for e in feed.entities
+        ],
+        forward=forward,
+        media=[[m.height, m.width, m.raw, m.is_video, m.thumbnail] for m in feed.media],
+    )
+    # a computed fingerprint may be of the untranslated entities, so it is kept as is
+    if fp := getattr(feed, "_fp", None):
+        detail["fingerprint"] = fp
+    return detail
+
+
+def _load_feed(columns: t.Dict[str, t.Any], detail: t.Dict[str, t.Any]) -> FeedContent:
+    entities = []
+    for e in detail["entities"]:
+        cls = _ENTITY_TYPES.get(e.pop("type"), TextEntity)
+        entities.append(cls.model_validate(e))
+
+    forward = detail["forward"]
+    if isinstance(forward, dict):
+        forward = _load_feed({c: forward.pop(c) for c in _FEED_COLUMNS}, forward)
+
+    feed = FeedContent(
+        entities=entities,
+        forward=forward,
+        media=[VisualMedia(*m) for m in detail["media"]],
+        **columns,
+    )
+    if fp := detail.get("fingerprint"):
+        feed._fp = fp
+    return feed
+
+
+class FeedStore:
+    """Store processed feeds and crawl states in a sqlite database.
+
+    Feeds are indexed by ``(uin, abstime)``, the same key used by :class:`.BaseFeed` for
+    hashing and ordering. Writes are buffered and committed in batches.
+
+    .. code-block:: python
+
+        api.store = FeedStore("feeds.db")
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(self, path: t.Union[str, Path] = ":memory:", batch_size: int = 100) -> None:
+        """
+        :param path: path to the database file, defaults to an in-memory database.
+        :param batch_size: buffered feeds are committed when this size is reached.
+        """
+        self.batch_size = batch_size
+        self._buffer: t.List[FeedContent] = []
+        self.db = sqlite3.connect(str(path))
+        with self.db:
+            self.db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS feed (
+                    uin INTEGER NOT NULL,
+                    abstime INTEGER NOT NULL,
+                    appid INTEGER,
+                    typeid INTEGER,
+                    fid TEXT,
+                    nickname TEXT,
+                    curkey TEXT,
+                    unikey TEXT,
+                    topicId TEXT,
+                    islike INTEGER,
+                    detail TEXT,
+                    PRIMARY KEY (uin, abstime)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS feed_abstime ON feed (abstime);
+                CREATE TABLE IF NOT EXISTS crawl_state (
+                    account INTEGER NOT NULL,
+                    host INTEGER NOT NULL,
+                    attach_info TEXT,
+                    mark_abstime INTEGER,
+                    mark_uin INTEGER,
+                    pending_abstime INTEGER,
+                    pending_uin INTEGER,
+                    PRIMARY KEY (account, host)
+                );
+                """
+            )
+
+    def __len__(self) -> int:
+        self.flush()
+        return self.db.execute("SELECT COUNT(*) FROM feed").fetchone()[0]
+
+    def add(self, feed: FeedContent) -> None:
+        """Buffer a feed. The buffer is flushed if :obj:`.batch_size` is reached."""
+        self._buffer.append(feed)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit buffered feeds in one transaction."""
+        if not self._buffer:
+            return
+        rows = [
+            (*(getattr(f, c) for c in _FEED_COLUMNS), json.dumps(_dump_detail(f)))
+            for f in self._buffer
+        ]
+        self._buffer.clear()
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO feed VALUES ({','.join('?' * (len(_FEED_COLUMNS) + 1))})",
+                rows,
+            )
+        log.debug(f"{len(rows)} feeds saved")
+
+    def _load_rows(self, rows: t.Iterable[tuple]) -> t.List[FeedContent]:
+        feeds = []
+        for row in rows:
+            columns = dict(zip(_FEED_COLUMNS, row))
+            columns["islike"] = bool(columns["islike"])
+            feeds.append(_load_feed(columns, json.loads(row[-1])))
+        return feeds
+
+    def get(self, uin: int, abstime: int) -> t.Optional[FeedContent]:
+        """Get a feed by its key."""
+        self.flush()
+        cur = self.db.execute("SELECT * FROM feed WHERE uin = ? AND abstime = ?", (uin, abstime))
+        feeds = self._load_rows(cur)
+        return feeds[0] if feeds else None
+
+    def query(
+        self,
+        since: t.Optional[float] = None,
+        until: t.Optional[float] = None,
+        uin: t.Optional[int] = None,
+        limit: t.Optional[int] = None,
+    ) -> t.List[FeedContent]:
+        """Query feeds by time range and owner, newest first.
+
+        :param since: min abstime, inclusive.
+        :param until: max abstime, inclusive.
+        :param uin: feed owner.
+        :param limit: max number of feeds to return.
+        """
+        self.flush()
+        conds, args = [], []
+        if since is not None:
+            conds.append("abstime >= ?")
+            args.append(since)
+        if until is not None:
+            conds.append("abstime <= ?")
+            args.append(until)
+        if uin is not None:
+            conds.append("uin = ?")
+            args.append(uin)
+
+        sql = "SELECT * FROM feed"
+        if conds:
+            sql += " WHERE " + " AND ".join(conds)
+        sql += " ORDER BY abstime DESC, uin DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return self._load_rows(self.db.execute(sql, args))
+
+    def load_state(self, account: int, host: int = 0) -> CrawlState:
+        """Load the crawl state.
+
+        :param account: login uin.
+        :param host: host uin of the crawl, ``0`` for active feeds.
+        """
+        row = self.db.execute(
+            "SELECT attach_info, mark_abstime, mark_uin, pending_abstime, pending_uin "
+            "FROM crawl_state WHERE account = ? AND host = ?",
+            (account, host),
+        ).fetchone()
+        if row is None:
+            return CrawlState()
+        attach_info, *keys = row
+        mark = tuple(keys[:2]) if keys[0] is not None else None
+        pending = tuple(keys[2:]) if keys[2] is not None else None
+        return CrawlState(attach_info, mark, pending)  # type: ignore
+
+    def save_state(self, account: int, host: int, state: CrawlState) -> None:
+        """Save the crawl state. Buffered feeds are flushed first, so that a saved state never
+        points beyond the saved feeds."""
+        self.flush()
+        mark = state.watermark or (None, None)
+        pending = state.pending or (None, None)
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO crawl_state VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (account, host, state.attach_info, *mark, *pending),
+            )
+
+    def close(self) -> None:
+        self.flush()
+        self.db.close()
@@ -1,5 +1,9 @@
-from dataclasses import dataclass, field
-from typing import List, Optional, Union
+import json
+import sys
+from dataclasses import dataclass, field, fields
+from hashlib import blake2b
+from itertools import chain
+from typing import Callable, List, Optional, Union
 
 from aioqzone.model import FeedData, ProfileFeedData
 from aioqzone.model.api.feed import FeedOriginal, FeedVideo, PicData, Share
@@ -8,8 +12,36 @@ from aioqzone.model.protocol import ConEntity
 from aioqzone.utils.entity import split_entities
 
 FEED_TYPES = Union[FeedData, ProfileFeedData]
+Translator = Callable[[List[ConEntity]], List[ConEntity]]
+"""A function to rewrite entities, e.g. :class:`~aioqzone_feed.utils.EmojiTranslator`."""
 
 
+def _slotted(cls):
+    """Recreate a dataclass with ``__slots__`` of its fields, just like ``dataclass(slots=True)``
+    in Python 3.10+. Fields declared in base ``__slots__`` are skipped. Slots declared in the
+    class body are kept for non-field attributes. Instances can be weakly referenced, as
+    before.
+
+    .. note:: Do not use zero-argument ``super()`` in the decorated class.
+    """
+    inherited = set(chain.from_iterable(getattr(b, "__slots__", ()) for b in cls.__mro__[1:]))
+    names = tuple(f.name for f in fields(cls) if f.name not in inherited)
+    names += tuple(cls.__dict__.get("__slots__", ()))
+    d = dict(cls.__dict__)
+    for name in names:
+        d.pop(name, None)
+    d.pop("__dict__", None)
+    d.pop("__weakref__", None)
+    if not any(b.__weakrefoffset__ for b in cls.__bases__):
+        names += ("__weakref__",)
+    d["__slots__"] = names
+
+    slotted = type(cls)(cls.__name__, cls.__bases__, d)
+    slotted.__qualname__ = cls.__qualname__
+    return slotted
+
+
+@_slotted
 @dataclass
 class VisualMedia:
     height: int
@@ -32,10 +64,16 @@ class VisualMedia:
             is_video=False,
             height=pic.origin_height,
             width=pic.origin_width,
-            raw=str(raw.url),
-            thumbnail=str(thumb.url),
+            **cls._urls(raw.url, thumb.url),
         )
 
+    @staticmethod
+    def _urls(raw, thumbnail):
+        """Share one string object if raw and thumbnail are the same url."""
+        raw = str(raw)
+        thumbnail = str(thumbnail)
+        return dict(raw=raw, thumbnail=raw if thumbnail == raw else thumbnail)
+
     @classmethod
     def from_video(cls, video: FeedVideo):
         assert video.videourl
@@ -56,14 +94,19 @@ class VisualMedia:
             is_video=False,
             height=raw.height,
             width=raw.width,
-            raw=str(raw.url),
-            thumbnail=str(thumb.url),
+            **cls._urls(raw.url, thumb.url),
         )
 
 
+@_slotted
 @dataclass
 class BaseFeed:
-    """FeedModel is a model for storing a feed, with the info to hashing and retrieving the feed."""
+    """FeedModel is a model for storing a feed, with the info to hashing and retrieving the feed.
+
+    .. versionchanged:: 1.3.0
+
+        Feed types use ``__slots__`` to save memory. Nicknames are interned.
+    """
 
     appid: int
     typeid: int
@@ -126,7 +169,7 @@ class BaseFeed:
             fid=obj.fid,
             abstime=obj.abstime,
             uin=obj.userinfo.uin,
-            nickname=obj.userinfo.nickname,
+            nickname=sys.intern(obj.userinfo.nickname),
             unikey=str(obj.common.orgkey),
             curkey=str(obj.common.curkey),
             islike=obj.like.isliked,
@@ -136,12 +179,31 @@ class BaseFeed:
 
 @dataclass
 class BaseDetail:
+    """A mixin of feed details. It has no storage by itself, so that it can be mixed with
+    :class:`BaseFeed`, see :class:`FeedContent`. A bare instance is stored by a private
+    subclass.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, *args, **kwds):
+        return object.__new__(_Detail if cls is BaseDetail else cls)
+
     entities: List[ConEntity] = field(default_factory=list)
     forward: Union["FeedContent", str, None] = None
     """unikey to the feed, or the content itself."""
     media: List[VisualMedia] = field(default_factory=list)
 
-    def set_detail(self, obj: Union[FeedData, ProfileFeedData]):
+    def set_detail(
+        self, obj: Union[FeedData, ProfileFeedData], translate: Optional[Translator] = None
+    ):
+        """
+        :param translate: if given, entities are rewritten by it, see :meth:`.translate`.
+
+        .. versionchanged:: 1.3.0
+
+            add `translate` parameter.
+        """
         self.entities = split_entities(obj.summary.summary)
         if obj.original:
             if isinstance(obj.original, FeedOriginal):
@@ -153,7 +215,7 @@ class BaseDetail:
                     fid=org.fid,
                     abstime=org.common.time,
                     uin=org.userinfo.uin,
-                    nickname=org.userinfo.nickname,
+                    nickname=sys.intern(org.userinfo.nickname),
                     curkey=str(org.common.curkey),
                     unikey=str(org.common.orgkey),
                 )
@@ -169,13 +231,144 @@ class BaseDetail:
             self.media = [VisualMedia.from_pic(i) for i in obj.pic.picdata]
         if isinstance(obj, FeedData) and obj.video:
             self.media.insert(0, VisualMedia.from_video(obj.video))
+        if translate is not None:
+            self.translate(translate)
 
+    def translate(self, translate: Translator):
+        """Rewrite entities of this feed, and of the forwarded feed, by `translate`.
 
+        .. versionadded:: 1.3.0
+        """
+        self.entities = translate(self.entities)
+        if isinstance(self.forward, BaseDetail):
+            self.forward.translate(translate)
+
+
+@_slotted
+@dataclass
+class _Detail(BaseDetail):
+    """Storage of a bare :class:`BaseDetail`."""
+
+
+_LAZY_FIELDS = ("entities", "forward", "media")
+
+
+@_slotted
 @dataclass
 class FeedContent(BaseDetail, BaseFeed):
     """FeedContent is feed with contents. This might be the common structure to
     represent a feed as what it's known."""
 
+    __slots__ = ("_raw", "_fp", "_tr")
+
     def __hash__(self) -> int:
         media_hash = hash(tuple(i.raw for i in self.media)) if self.media else 0
         return hash((self.uin, self.abstime, self.forward, media_hash))
+
+    @property
+    def fingerprint(self) -> str:
+        """A stable digest of the content: entities, forward and media urls. Unlike
+        :meth:`.__hash__`, it is the same across processes, so it can be saved to tell if a
+        feed is edited.
+
+        It is computed on first access, and then cached. Changing the content afterwards does
+        not change it. Entities are digested before they are translated, so it does not depend
+        on the translator, nor on whether it succeeds.
+
+        .. versionadded:: 1.3.0
+        """
+        try:
+            return object.__getattribute__(self, "_fp")
+        except AttributeError:
+            pass
+        if not self.materialized:
+            # it is computed by materializing if entities are translated then
+            self.entities
+            return self.fingerprint
+        self._fp = self._digest()
+        return self._fp
+
+    def _digest(self) -> str:
+        forward = self.forward
+        content = dict(
+            entities=[[e.__class__.__name__, e.model_dump(mode="json")] for e in self.entities],
+            forward=forward.fingerprint if isinstance(forward, FeedContent) else forward,
+            media=[[m.raw, m.is_video] for m in self.media],
+        )
+        data = json.dumps(content, sort_keys=True, ensure_ascii=False).encode()
+        return blake2b(data, digest_size=16).hexdigest()
+
+    def set_detail(
+        self,
+        obj: Union[FeedData, ProfileFeedData],
+        lazy: bool = False,
+        translate: Optional[Translator] = None,
+    ):
+        """
+        :param lazy: If True, :obj:`.entities`, :obj:`.forward` and :obj:`.media` are computed
+            on first access, and `obj` is released afterwards. So is :obj:`.fingerprint`.
+        :param translate: if given, entities are rewritten by it, see :meth:`.translate`.
+            If `lazy`, it is called on first access as well.
+
+        .. versionchanged:: 1.3.0
+
+            add `lazy` and `translate` parameters.
+        """
+        if not lazy:
+            BaseDetail.set_detail(self, obj, translate)
+            return
+
+        if hasattr(self, "_fp"):
+            del self._fp
+        self._raw = obj
+        if translate is not None:
+            self._tr = translate
+        elif hasattr(self, "_tr"):
+            del self._tr
+        for name in _LAZY_FIELDS:
+            delattr(self, name)
+
+    def translate(self, translate: Translator):
+        """
+        If entities are changed, :obj:`.fingerprint` is computed before, if not yet.
+
+        .. versionadded:: 1.3.0
+        """
+        if isinstance(self.forward, BaseDetail):
+            self.forward.translate(translate)
+        entities = translate(self.entities)
+        if entities is not self.entities:
+            self.fingerprint  # cached from the untranslated entities
+            self.entities = entities
+
+    def __getattr__(self, name: str):
+        # only called if a lazy field is not set yet
+        if name in _LAZY_FIELDS:
+            try:
+                raw = object.__getattribute__(self, "_raw")
+            except AttributeError:
+                pass
+            else:
+                del self._raw
+                try:
+                    translate = object.__getattribute__(self, "_tr")
+                except AttributeError:
+                    translate = None
+                else:
+                    del self._tr
+                self.entities, self.forward, self.media = [], None, []
+                BaseDetail.set_detail(self, raw, translate)
+                return object.__getattribute__(self, name)
+        raise AttributeError(f"{self.__class__.__name__!r} object has no attribute {name!r}")
+
+    @property
+    def materialized(self) -> bool:
+        """If details are computed (or not lazy at all).
+
+        .. versionadded:: 1.3.0
+        """
+        try:
+            object.__getattribute__(self, "_raw")
+        except AttributeError:
+            return True
+        return False
@@ -0,0 +1,32 @@
+"""Helpers used by aioqzone-feed apis.
+
+.. versionadded:: 1.3.0
+"""
+from .batch import Batcher
+from .cache import CacheBackend, ShelveBackend, TTLCache
+from .emoji import EmojiTranslator, JsonSource, MappingSource, SqliteSource
+from .executor import BoundedExecutor, TokenBucket
+from .fingerprint import FingerprintIndex
+from .media import MediaCache
+from .metrics import Metrics, statsd_sink
+from .rules import DropRules
+from .seen import SeenCache
+
+__all__ = [
+    "SeenCache",
+    "BoundedExecutor",
+    "TokenBucket",
+    "TTLCache",
+    "CacheBackend",
+    "ShelveBackend",
+    "Metrics",
+    "statsd_sink",
+    "DropRules",
+    "MediaCache",
+    "FingerprintIndex",
+    "Batcher",
+    "EmojiTranslator",
+    "MappingSource",
+    "JsonSource",
+    "SqliteSource",
+]
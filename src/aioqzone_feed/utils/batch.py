@@ -0,0 +1,73 @@
+import asyncio
+import typing as t
+
+__all__ = ["Batcher"]
+
+K = t.TypeVar("K")
+T = t.TypeVar("T")
+
+
+class Batcher(t.Generic[K, T]):
+    """Collect items of the same key into batches, and pass each batch to a callback.
+
+    A batch is flushed when it has :obj:`.max_size` items, when :obj:`.max_delay` seconds
+    passed since its first item, when an item of another key is added, or when :meth:`.flush`
+    is called.
+
+    .. code-block:: python
+
+        batcher = Batcher(lambda bid, feeds: db.insert_many(feeds), max_size=100)
+        batcher.add(bid, feed)
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(
+        self,
+        callback: t.Callable[[K, t.List[T]], t.Any],
+        max_size: int = 50,
+        max_delay: float = 0.1,
+    ) -> None:
+        """
+        :param callback: called with the key and items of each batch.
+        :param max_size: max number of items in a batch.
+        :param max_delay: max seconds an item waits before its batch is flushed.
+        """
+        assert max_size > 0
+        self.callback = callback
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._key: t.Optional[K] = None
+        self._items: t.List[T] = []
+        self._timer: t.Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        """Number of items waiting to be flushed."""
+        return len(self._items)
+
+    def add(self, key: K, item: T) -> None:
+        if self._items and key != self._key:
+            self.flush()
+        if not self._items:
+            self._key = key
+            self._timer = asyncio.get_event_loop().call_later(self.max_delay, self.flush)
+        self._items.append(item)
+        if len(self._items) >= self.max_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Pass the pending batch, if any, to the callback now."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if not self._items:
+            return
+        items, self._items = self._items, []
+        self.callback(self._key, items)  # type: ignore
+
+    def clear(self) -> None:
+        """Drop the pending batch."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._items = []
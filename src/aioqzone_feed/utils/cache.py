@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import shelve
+import time
+import typing as t
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+__all__ = ["TTLCache", "CacheBackend", "ShelveBackend"]
+
+K = t.TypeVar("K", bound=t.Hashable)
+V = t.TypeVar("V")
+
+
+class CacheBackend(t.Protocol):
+    """A secondary storage of :class:`TTLCache`, e.g. on disk.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def get(self, key: t.Hashable) -> t.Optional[t.Tuple[float, t.Any]]:
+        """:return: ``(expire_at, value)`` or None"""
+        ...
+
+    def set(self, key: t.Hashable, expire_at: float, value: t.Any) -> None:
+        ...
+
+    def delete(self, key: t.Hashable) -> None:
+        ...
+
+
+class ShelveBackend:
+    """A :class:`CacheBackend` based on :mod:`shelve`. Values should be picklable.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(self, path: t.Union[str, Path]) -> None:
+        self.db = shelve.open(str(path))
+
+    def get(self, key: t.Hashable) -> t.Optional[t.Tuple[float, t.Any]]:
+        return self.db.get(repr(key))
+
+    def set(self, key: t.Hashable, expire_at: float, value: t.Any) -> None:
+        self.db[repr(key)] = (expire_at, value)
+
+    def delete(self, key: t.Hashable) -> None:
+        self.db.pop(repr(key), None)
+
+    def purge(self) -> int:
+        """Remove expired entries.
+
+        :return: number of entries removed.
+        """
+        now = time.time()
+        expired = [k for k, (expire_at, _) in self.db.items() if expire_at < now]
+        for k in expired:
+            del self.db[k]
+        return len(expired)
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class TTLCache(t.Generic[K, V]):
+    """An LRU cache whose entries expire after :obj:`.ttl` seconds, with an optional
+    :class:`CacheBackend`. Concurrent :meth:`.get_or_fetch` calls on the same key share
+    one in-flight fetch.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(
+        self, maxsize: int = 1024, ttl: float = 600, backend: t.Optional[CacheBackend] = None
+    ) -> None:
+        """
+        :param maxsize: max number of entries in memory.
+        :param ttl: seconds before an entry expires.
+        :param backend: a secondary storage. Entries evicted from memory can be found in it.
+        """
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._data: "OrderedDict[K, t.Tuple[float, V]]" = OrderedDict()
+        self._inflight: t.Dict[K, "asyncio.Future[V]"] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        """Number of calls that waited for an in-flight fetch."""
+
+    @property
+    def stats(self) -> t.Dict[str, int]:
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            coalesced=self.coalesced,
+            size=len(self._data),
+            inflight=len(self._inflight),
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _get(self, key: K) -> t.Optional[V]:
+        now = time.time()
+        entry = self._data.get(key)
+        if entry is not None:
+            if entry[0] >= now:
+                self._data.move_to_end(key)
+                return entry[1]
+            del self._data[key]
+
+        if self.backend is None:
+            return None
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            self.backend.delete(key)
+            return None
+        self._put(key, *entry)
+        return entry[1]
+
+    def get(self, key: K) -> t.Optional[V]:
+        """Get an unexpired value, or None."""
+        v = self._get(key)
+        if v is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return v
+
+    def _put(self, key: K, expire_at: float, value: V) -> None:
+        self._data[key] = (expire_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def set(self, key: K, value: V) -> None:
+        expire_at = time.time() + self.ttl
+        self._put(key, expire_at, value)
+        if self.backend is not None:
+            self.backend.set(key, expire_at, value)
+
+    def _on_fetched(self, key: K, fut: "asyncio.Future[V]") -> None:
+        self._inflight.pop(key, None)
+        if not fut.cancelled() and fut.exception() is None:
+            self.set(key, fut.result())
+
+    async def get_or_fetch(self, key: K, fetch: t.Callable[[], t.Awaitable[V]]) -> V:
+        """Get the value from cache, or call `fetch` and cache its result. If a fetch of the
+        same key is in flight, wait for it instead of calling `fetch` again. Exceptions are
+        not cached.
+        """
+        v = self._get(key)
+        if v is not None:
+            self.hits += 1
+            return v
+
+        fut = self._inflight.get(key)
+        if fut is None:
+            self.misses += 1
+            fut = self._inflight[key] = asyncio.ensure_future(fetch())
+            fut.add_done_callback(partial(self._on_fetched, key))
+        else:
+            self.coalesced += 1
+        # one caller being cancelled should not cancel the shared fetch
+        return await asyncio.shield(fut)
+
+    def clear(self) -> None:
+        self._data.clear()
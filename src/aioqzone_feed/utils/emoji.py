@@ -0,0 +1,172 @@
+import json
+import logging
+import re
+import sqlite3
+import typing as t
+from collections import OrderedDict
+from pathlib import Path
+
+from aioqzone.model import ConEntity, EmEntity, TextEntity
+from aioqzone.model.api.feed import FeedOriginal
+
+from aioqzone_feed.type import FEED_TYPES
+
+log = logging.getLogger(__name__)
+
+__all__ = ["EmojiSource", "MappingSource", "JsonSource", "SqliteSource", "EmojiTranslator"]
+
+RE_EMOJI = re.compile(r"\[em\]e(\d+)\[/em\]")
+
+
+class EmojiSource(t.Protocol):
+    """Where :class:`EmojiTranslator` looks up emoji texts.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def lookup(self, eids: t.Collection[int]) -> t.Mapping[int, str]:
+        """:return: texts of the given eids. Unknown eids are absent."""
+        ...
+
+
+class MappingSource:
+    """An :class:`EmojiSource` of a mapping from eid to text.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(self, mapping: t.Mapping[int, str]) -> None:
+        self.mapping = mapping
+
+    def lookup(self, eids: t.Collection[int]) -> t.Mapping[int, str]:
+        return {i: self.mapping[i] for i in eids if i in self.mapping}
+
+
+class JsonSource(MappingSource):
+    """An :class:`EmojiSource` of a json file like ``{"100": "微笑"}``, loaded at once.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(self, path: t.Union[str, Path]) -> None:
+        with open(path, encoding="utf8") as f:
+            super().__init__({int(k): v for k, v in json.load(f).items()})
+
+
+class SqliteSource:
+    """An :class:`EmojiSource` of a sqlite table. Each lookup is one query.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(
+        self, path: t.Union[str, Path], table: str = "emoji", key: str = "eid", value: str = "text"
+    ) -> None:
+        """
+        :param path: the database file.
+        :param table: the table of emoji texts.
+        :param key: column of eids.
+        :param value: column of texts.
+        """
+        self.db = sqlite3.connect(str(path))
+        self._sql = f"SELECT {key}, {value} FROM {table} WHERE {key} IN "
+
+    def lookup(self, eids: t.Collection[int]) -> t.Mapping[int, str]:
+        eids = list(eids)
+        r = {}
+        # keep the number of variables under sqlite's limit
+        for i in range(0, len(eids), 500):
+            chunk = eids[i : i + 500]
+            sql = self._sql + f"({','.join('?' * len(chunk))})"
+            r.update(self.db.execute(sql, chunk).fetchall())
+        return r
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class EmojiTranslator:
+    """Translate :external:class:`aioqzone.model.EmEntity` into
+    :external:class:`aioqzone.model.TextEntity`, with an LRU cache in front of an
+    :class:`EmojiSource`. Emojis unknown to the source are kept as is.
+
+    Calling it on an entity list looks up its uncached eids in one batch. :meth:`.prefetch_feeds`
+    does the same for all feeds of a page before they are converted.
+
+    .. code-block:: python
+
+        api.emoji = EmojiTranslator(JsonSource("emoji.json"))
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(self, source: EmojiSource, maxsize: int = 1024, fmt: str = "[/{}]") -> None:
+        """
+        :param source: where texts are looked up.
+        :param maxsize: max number of eids to cache, including unknown ones.
+        :param fmt: format of the translated text.
+        """
+        assert maxsize > 0
+        self.source = source
+        self.maxsize = maxsize
+        self.fmt = fmt
+        self._cache: "OrderedDict[int, t.Optional[str]]" = OrderedDict()
+        self.lookups = 0
+        """Number of calls to :meth:`EmojiSource.lookup`."""
+        self.misses = 0
+        """Number of eids looked up in the source."""
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def prefetch(self, eids: t.Iterable[int]) -> None:
+        """Look up uncached `eids` in one batch."""
+        missing = set()
+        for i in eids:
+            if i in self._cache:
+                self._cache.move_to_end(i)
+            else:
+                missing.add(i)
+        if not missing:
+            return
+        self.lookups += 1
+        self.misses += len(missing)
+        try:
+            found = self.source.lookup(missing)
+        except Exception as e:
+            # not cached, so they will be looked up again next time
+            log.warning(f"failed to look up emoji {missing}: {e}")
+            return
+        for i in missing:
+            self._cache[i] = found.get(i)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def prefetch_feeds(self, feeds: t.Iterable[FEED_TYPES]) -> None:
+        """Look up emojis in summaries of raw `feeds`, and of their forwarded feeds."""
+        eids: t.Set[int] = set()
+        for feed in feeds:
+            eids.update(map(int, RE_EMOJI.findall(feed.summary.summary)))
+            if isinstance(feed.original, FeedOriginal):
+                eids.update(map(int, RE_EMOJI.findall(feed.original.summary.summary)))
+        self.prefetch(eids)
+
+    def get(self, eid: int) -> t.Optional[str]:
+        """Get the text of a cached emoji, or None."""
+        if eid not in self._cache:
+            return None
+        self._cache.move_to_end(eid)
+        return self._cache[eid]
+
+    def __call__(self, entities: t.List[ConEntity]) -> t.List[ConEntity]:
+        eids = [e.eid for e in entities if isinstance(e, EmEntity)]
+        if not eids:
+            return entities
+        self.prefetch(eids)
+
+        r: t.List[ConEntity] = []
+        for e in entities:
+            text = self.get(e.eid) if isinstance(e, EmEntity) else None
+            r.append(e if text is None else TextEntity(con=self.fmt.format(text)))
+        # the same list if nothing is translated, so that the feed is known to be unchanged
+        return entities if all(a is b for a, b in zip(r, entities)) else r
@@ -0,0 +1,112 @@
+import asyncio
+import time
+import typing as t
+
+from tenacity import AsyncRetrying
+
+__all__ = ["TokenBucket", "BoundedExecutor"]
+
+T = t.TypeVar("T")
+
+
+class TokenBucket:
+    """An async token bucket. Tokens are refilled at :obj:`.rate` per second, and at most
+    :obj:`.burst` tokens can be saved.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        assert rate > 0 and burst > 0
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class BoundedExecutor:
+    """Run coroutines with a max in-flight count, an optional rate limit and an optional retry policy.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = 4,
+        rate: t.Optional[float] = None,
+        burst: int = 1,
+        retry: t.Optional[AsyncRetrying] = None,
+    ) -> None:
+        """
+        :param max_inflight: max number of coroutines running at the same time.
+        :param rate: max number of calls per second, defaults to None, means no limit.
+        :param burst: bucket size of the rate limit.
+        :param retry: a :class:`tenacity.AsyncRetrying` as the retry policy. It is copied
+            for each call. Defaults to None, means no retry.
+        """
+        assert max_inflight > 0
+        self.max_inflight = max_inflight
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.retry = retry
+        self._sem = asyncio.Semaphore(max_inflight)
+
+        self.queued = 0
+        """Number of calls waiting for an in-flight slot."""
+        self.inflight = 0
+        """Number of calls running."""
+        self.done = 0
+        """Number of calls succeeded."""
+        self.failed = 0
+        """Number of calls failed (after retrying)."""
+
+    @property
+    def stats(self) -> t.Dict[str, int]:
+        return dict(queued=self.queued, inflight=self.inflight, done=self.done, failed=self.failed)
+
+    async def _call(self, func: t.Callable[[], t.Awaitable[T]]) -> T:
+        if self.bucket:
+            await self.bucket.acquire()
+        return await func()
+
+    async def submit(self, func: t.Callable[[], t.Awaitable[T]]) -> T:
+        """Call `func` once a slot is available.
+
+        :param func: a function returns an awaitable. It may be called more than once if retry is set.
+        :raise: Exceptions raised by `func` (with `reraise=True`), or :exc:`tenacity.RetryError`.
+        """
+        self.queued += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.queued -= 1
+
+        self.inflight += 1
+        try:
+            if self.retry is None:
+                r = await self._call(func)
+            else:
+                r = await self.retry.copy()(self._call, func)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.inflight -= 1
+            self._sem.release()
+
+        self.done += 1
+        return r
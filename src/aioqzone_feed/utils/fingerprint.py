@@ -0,0 +1,29 @@
+import typing as t
+
+from aioqzone_feed.type import FeedContent
+from aioqzone_feed.utils.lru import FeedLRU
+
+__all__ = ["FingerprintIndex"]
+
+
+class FingerprintIndex(FeedLRU[str]):
+    """Remember :obj:`~aioqzone_feed.type.FeedContent.fingerprint` of feeds by
+    ``(uin, abstime)``, to tell whether a feed got again is edited.
+
+    The least recently updated feed is evicted once :obj:`.maxsize` is exceeded.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def get(self, uin: int, abstime: int) -> t.Optional[str]:
+        return self._data.get((uin, abstime))
+
+    def update(self, feed: FeedContent) -> t.Optional[str]:
+        """Save the fingerprint of `feed`.
+
+        :return: the fingerprint saved before, None if the feed is not known.
+        """
+        key = (feed.uin, feed.abstime)
+        old = self._data.get(key)
+        self._set(key, feed.fingerprint)
+        return old
@@ -0,0 +1,69 @@
+import json
+import logging
+import typing as t
+from collections import OrderedDict
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+__all__ = ["FeedKey", "FeedLRU"]
+
+FeedKey = t.Tuple[int, int]
+"""A ``(uin, abstime)`` tuple, the same identity as :meth:`BaseFeed.__hash__`."""
+V = t.TypeVar("V")
+
+
+class FeedLRU(t.Generic[V]):
+    """A bounded mapping from :obj:`FeedKey` to values, which can be persisted in a json file.
+    The least recently updated feed is evicted once :obj:`.maxsize` is exceeded.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(self, maxsize: int = 4096, path: t.Union[str, Path, None] = None) -> None:
+        """
+        :param maxsize: max number of feeds to remember.
+        :param path: a json file to persist entries. If given and exists, it will be loaded.
+        """
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.path = Path(path) if path else None
+        self._data: "OrderedDict[FeedKey, V]" = OrderedDict()
+        if self.path and self.path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _set(self, key: FeedKey, value: V) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _keep(self, value: V) -> bool:
+        """If a loaded entry is kept."""
+        return True
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def load(self) -> None:
+        """Load entries from :obj:`.path`."""
+        assert self.path
+        try:
+            with open(self.path, encoding="utf8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"failed to load {self.__class__.__name__} from {self.path}: {e}")
+            return
+
+        for uin, abstime, value in entries[-self.maxsize :]:
+            if self._keep(value):
+                self._data[(uin, abstime)] = value
+
+    def dump(self) -> None:
+        """Save entries to :obj:`.path`. This should be called before the process exits."""
+        assert self.path
+        with open(self.path, "w", encoding="utf8") as f:
+            json.dump([[*k, v] for k, v in self._data.items()], f)
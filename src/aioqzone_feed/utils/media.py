@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import typing as t
+from collections import OrderedDict
+from hashlib import blake2b
+from pathlib import Path
+
+from aioqzone_feed.type import VisualMedia
+
+log = logging.getLogger(__name__)
+
+__all__ = ["MediaCache"]
+
+
+class MediaCache:
+    """A content-addressed file cache of media.
+
+    Files are named by the hash of their content, so a picture shared by many feeds, or
+    served under many urls, is saved only once. When the total size exceeds
+    :obj:`.max_bytes`, least recently used files are removed.
+
+    .. versionadded:: 1.3.0
+    """
+
+    INDEX = "index.json"
+
+    def __init__(self, root: t.Union[str, Path], max_bytes: int = 256 << 20) -> None:
+        """
+        :param root: directory to save files. Files in it are reused.
+        :param max_bytes: max total size of cached files.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.total = 0
+        """Total size of cached files."""
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._urls: t.Dict[str, str] = {}
+
+        files = [p for p in self.root.glob("??/*") if p.is_file() and not p.suffix]
+        for p in sorted(files, key=lambda p: p.stat().st_mtime):
+            self._files[p.name] = size = p.stat().st_size
+            self.total += size
+        index = self.root / self.INDEX
+        if index.exists():
+            with open(index, encoding="utf8") as f:
+                self._urls = {k: v for k, v in json.load(f).items() if v in self._files}
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __contains__(self, url: str) -> bool:
+        return self._urls.get(url) in self._files
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def get(self, url: str) -> t.Optional[Path]:
+        """Get the cached file of `url`, or None."""
+        digest = self._urls.get(url)
+        if digest is None or digest not in self._files:
+            return None
+        self._files.move_to_end(digest)
+        return self._path(digest)
+
+    def localize(self, media: VisualMedia, path: t.Optional[Path] = None) -> VisualMedia:
+        """Replace the url of a raw photo, or of the cover of a video, with the ``file://`` url
+        of its cached file. Stored feeds keep remote urls, so call this when reading them.
+
+        :param path: the cached file. Looked up by the url if not given.
+        :return: a new object, or `media` itself if it is not cached.
+        """
+        url = media.thumbnail if media.is_video else media.raw
+        if path is None and url:
+            path = self.get(url)
+        if path is None:
+            return media
+        uri = path.absolute().as_uri()
+        if media.is_video:
+            return VisualMedia(media.height, media.width, media.raw, True, uri)
+        return VisualMedia(media.height, media.width, uri, False, media.thumbnail)
+
+    def put(self, url: str, data: bytes) -> Path:
+        """Save the content of `url` and return the path of the file."""
+        digest = blake2b(data, digest_size=16).hexdigest()
+        path = self._path(digest)
+        if digest in self._files:
+            self._files.move_to_end(digest)
+        else:
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._files[digest] = len(data)
+            self.total += len(data)
+        self._urls[url] = digest
+        self._evict()
+        return path
+
+    def _evict(self) -> None:
+        # keep at least the newest file even if it alone exceeds the limit
+        while self.total > self.max_bytes and len(self._files) > 1:
+            digest, size = self._files.popitem(last=False)
+            self.total -= size
+            try:
+                self._path(digest).unlink()
+            except FileNotFoundError:
+                pass
+            log.debug(f"media evicted: {digest}")
+
+    def save(self) -> None:
+        """Save the url index, so that a new instance on the same :obj:`.root` can reuse it."""
+        urls = {k: v for k, v in self._urls.items() if v in self._files}
+        with open(self.root / self.INDEX, "w", encoding="utf8") as f:
+            json.dump(urls, f)
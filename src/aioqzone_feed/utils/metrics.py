@@ -0,0 +1,167 @@
+import bisect
+import time
+import typing as t
+from contextlib import contextmanager, nullcontext
+
+__all__ = ["Histogram", "Metrics", "statsd_sink", "timed"]
+
+T = t.TypeVar("T")
+
+Sink = t.Callable[[str, str, float], t.Any]
+"""A callback receives ``(kind, name, value)`` on each record, where `kind` is one of
+``counter``, ``histogram`` and ``gauge``. Histogram values are in seconds."""
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """A cumulative histogram with fixed upper bounds, in seconds.
+
+    .. versionadded:: 1.3.0
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: t.Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        """Count of each bucket. The last one is ``+Inf``."""
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by the upper bound of the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        rank, acc = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            acc += n
+            if acc >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Counters, latency histograms and gauges of the feed pipeline.
+
+    Assign an instance to :obj:`.HeartbeatApi.metrics` to enable it. Records can be pulled by
+    :meth:`.snapshot` and :meth:`.prometheus`, or pushed to a :obj:`Sink` such as
+    :func:`statsd_sink`.
+
+    .. code-block:: python
+
+        api.metrics = Metrics(sink=statsd_sink(sock.send))
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(
+        self,
+        sink: t.Optional[Sink] = None,
+        *,
+        prefix: str = "aioqzone_feed",
+        buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.sink = sink
+        self.prefix = prefix
+        self.buckets = buckets
+        self.counters: t.Dict[str, int] = {}
+        self.histograms: t.Dict[str, Histogram] = {}
+        self.gauges: t.Dict[str, float] = {}
+
+    def inc(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+        if self.sink:
+            self.sink("counter", name, n)
+
+    def observe(self, name: str, seconds: float) -> None:
+        h = self.histograms.get(name)
+        if h is None:
+            h = self.histograms[name] = Histogram(self.buckets)
+        h.observe(seconds)
+        if self.sink:
+            self.sink("histogram", name, seconds)
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+        if self.sink:
+            self.sink("gauge", name, value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Observe the time spent in this context into histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    async def timed_await(self, name: str, aw: t.Awaitable[T]) -> T:
+        """Await `aw` and observe the time spent into histogram `name`."""
+        with self.timer(name):
+            return await aw
+
+    def snapshot(self) -> t.Dict[str, t.Any]:
+        """Return counters, gauges, and count/sum/p50/p99 of each histogram."""
+        return dict(
+            counters=dict(self.counters),
+            gauges=dict(self.gauges),
+            histograms={
+                k: dict(count=h.count, sum=h.sum, p50=h.quantile(0.5), p99=h.quantile(0.99))
+                for k, h in self.histograms.items()
+            },
+        )
+
+    def prometheus(self) -> str:
+        """Render all records in Prometheus text exposition format."""
+        lines = []
+        for k, v in sorted(self.counters.items()):
+            name = f"{self.prefix}_{k}_total"
+            lines += [f"# TYPE {name} counter", f"{name} {v}"]
+        for k, v in sorted(self.gauges.items()):
+            name = f"{self.prefix}_{k}"
+            lines += [f"# TYPE {name} gauge", f"{name} {v}"]
+        for k, h in sorted(self.histograms.items()):
+            name = f"{self.prefix}_{k}_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            acc = 0
+            for bound, n in zip(h.buckets, h.counts):
+                acc += n
+                lines.append(f'{name}_bucket{{le="{bound}"}} {acc}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {h.count}')
+            lines += [f"{name}_sum {h.sum}", f"{name}_count {h.count}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+        self.gauges.clear()
+
+
+def statsd_sink(send: t.Callable[[str], t.Any], prefix: str = "aioqzone_feed") -> Sink:
+    """Make a :obj:`Sink` that formats records as StatsD lines and passes them to `send`,
+    e.g. ``lambda s: sock.sendto(s.encode(), addr)``.
+
+    .. versionadded:: 1.3.0
+    """
+    types = dict(counter="c", histogram="ms", gauge="g")
+
+    def sink(kind: str, name: str, value: float):
+        if kind == "histogram":
+            value = round(value * 1e3, 3)
+        send(f"{prefix}.{name}:{value}|{types[kind]}")
+
+    return sink
+
+
+_NULL_CONTEXT = nullcontext()
+
+
+def timed(metrics: t.Optional[Metrics], name: str) -> t.ContextManager[None]:
+    """:meth:`Metrics.timer` if `metrics` is given, else a context that does nothing."""
+    return _NULL_CONTEXT if metrics is None else metrics.timer(name)
@@ -0,0 +1,152 @@
+import json
+import logging
+import re
+import typing as t
+from pathlib import Path
+
+from aioqzone_feed.type import FEED_TYPES
+
+log = logging.getLogger(__name__)
+
+__all__ = ["DropRules"]
+
+_Matcher = t.Callable[[FEED_TYPES], t.Optional[str]]
+
+
+class DropRules:
+    """Declarative rules to drop feeds, evaluated on raw :external:class:`aioqzone.model.FeedData`
+    before any model is built.
+
+    Rules are compiled into one matcher: set lookups for uins, appids and typeids, one
+    :meth:`str.startswith` call for all fid prefixes, and one regex for all keywords. Calling
+    :meth:`.update` or :meth:`.reload` swaps the matcher at once, so rules can be changed
+    while a crawl is running.
+
+    .. code-block:: python
+
+        api.drop_rules = DropRules.from_file("rules.json")
+        ...
+        api.drop_rules.reload()  # re-read the file if it is modified
+
+    .. versionadded:: 1.3.0
+    """
+
+    FIELDS = ("uins", "appids", "typeids", "fid_prefixes", "keywords", "patterns")
+
+    def __init__(
+        self,
+        *,
+        uins: t.Iterable[int] = (),
+        appids: t.Iterable[int] = (),
+        typeids: t.Iterable[int] = (),
+        fid_prefixes: t.Iterable[str] = (),
+        keywords: t.Iterable[str] = (),
+        patterns: t.Iterable[str] = (),
+    ) -> None:
+        """
+        :param uins: drop feeds owned by these users.
+        :param appids: drop feeds of these :external+aioqzone:term:`appid`.
+        :param typeids: drop feeds of these typeids.
+        :param fid_prefixes: drop feeds whose fid starts with one of these.
+        :param keywords: drop feeds whose summary contains one of these.
+        :param patterns: drop feeds whose summary matches one of these regexes.
+        """
+        self.path: t.Optional[Path] = None
+        self._mtime = 0.0
+        self.update(
+            uins=uins,
+            appids=appids,
+            typeids=typeids,
+            fid_prefixes=fid_prefixes,
+            keywords=keywords,
+            patterns=patterns,
+        )
+
+    @classmethod
+    def default(cls):
+        """Rules used by :class:`.FeedH5Api` by default, which drop advertisements."""
+        return cls(uins=[20050606], fid_prefixes=["advertisement"])
+
+    @classmethod
+    def from_file(cls, path: t.Union[str, Path]):
+        """Load rules from a json file, whose keys are parameters of :class:`DropRules`."""
+        self = cls()
+        self.path = Path(path)
+        self.reload()
+        return self
+
+    def rules(self) -> t.Dict[str, t.List]:
+        """Current rules, in the form accepted by :meth:`.update`."""
+        return {k: sorted(getattr(self, k)) for k in self.FIELDS}
+
+    def update(self, **rules: t.Iterable) -> None:
+        """Replace some kinds of rules, e.g. ``update(uins=[1, 2])``. Other kinds are kept.
+
+        :raise `TypeError`: if an unknown kind is given.
+        :raise `re.error`: if a pattern is invalid. Current rules are kept in this case.
+        """
+        unknown = set(rules) - set(self.FIELDS)
+        if unknown:
+            raise TypeError(f"unknown rules: {', '.join(unknown)}")
+
+        new = {k: frozenset(rules[k]) if k in rules else getattr(self, k) for k in self.FIELDS}
+        matcher = self._compile(**new)
+        for k, v in new.items():
+            setattr(self, k, v)
+        self._matcher = matcher
+
+    def reload(self) -> bool:
+        """Re-read rules from :obj:`.path` if the file is modified since last load.
+
+        :return: if rules are reloaded.
+        """
+        if self.path is None:
+            return False
+        mtime = self.path.stat().st_mtime
+        if mtime == self._mtime:
+            return False
+        with open(self.path, encoding="utf8") as f:
+            rules = json.load(f)
+        self.update(**{k: rules.get(k, ()) for k in self.FIELDS})
+        self._mtime = mtime
+        log.info(f"drop rules reloaded from {self.path}")
+        return True
+
+    @staticmethod
+    def _compile(
+        uins: t.FrozenSet[int],
+        appids: t.FrozenSet[int],
+        typeids: t.FrozenSet[int],
+        fid_prefixes: t.FrozenSet[str],
+        keywords: t.FrozenSet[str],
+        patterns: t.FrozenSet[str],
+    ) -> _Matcher:
+        checks: t.List[_Matcher] = []
+        if uins:
+            checks.append(lambda f: "uin" if f.userinfo.uin in uins else None)
+        if appids:
+            checks.append(lambda f: "appid" if f.common.appid in appids else None)
+        if typeids:
+            checks.append(lambda f: "typeid" if f.common.typeid in typeids else None)
+        if fid_prefixes:
+            prefixes = tuple(fid_prefixes)
+            checks.append(lambda f: "fid" if f.fid.startswith(prefixes) else None)
+        regex = "|".join([re.escape(i) for i in keywords] + [f"(?:{i})" for i in patterns])
+        if regex:
+            search = re.compile(regex).search
+            checks.append(lambda f: "summary" if search(f.summary.summary) else None)
+
+        def match(feed: FEED_TYPES) -> t.Optional[str]:
+            for check in checks:
+                reason = check(feed)
+                if reason:
+                    return reason
+
+        return match
+
+    def match(self, feed: FEED_TYPES) -> t.Optional[str]:
+        """:return: the kind of the rule hit by `feed`, or None if no rule is hit."""
+        return self._matcher(feed)
+
+    def __call__(self, feed: FEED_TYPES) -> bool:
+        return self._matcher(feed) is not None
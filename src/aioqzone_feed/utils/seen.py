@@ -0,0 +1,62 @@
+import time
+import typing as t
+from pathlib import Path
+
+from aioqzone_feed.utils.lru import FeedKey, FeedLRU
+
+__all__ = ["SeenCache"]
+
+
+class SeenCache(FeedLRU[float]):
+    """A bounded cache that remembers feeds that have been seen.
+
+    Feeds are identified by ``(uin, abstime)``, the same identity used by
+    :meth:`~aioqzone_feed.type.BaseFeed.__hash__`. The least recently seen feed is evicted
+    once :obj:`.maxsize` is exceeded, and entries older than :obj:`.ttl` are expired.
+
+    .. versionadded:: 1.3.0
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        ttl: t.Optional[float] = None,
+        path: t.Union[str, Path, None] = None,
+    ) -> None:
+        """
+        :param maxsize: max number of feeds to remember.
+        :param ttl: seconds before a seen feed is forgotten, defaults to None, means never.
+        :param path: a json file to persist the cache. If given and exists, it will be loaded.
+        """
+        self.ttl = ttl
+        super().__init__(maxsize, path)
+
+    def __contains__(self, key: FeedKey) -> bool:
+        ts = self._data.get(key)
+        if ts is None:
+            return False
+        if self.ttl is not None and time.time() - ts > self.ttl:
+            del self._data[key]
+            return False
+        return True
+
+    def add(self, key: FeedKey) -> None:
+        """Mark a feed as seen."""
+        self._set(key, time.time())
+
+    def check(self, uin: int, abstime: int) -> bool:
+        """Check if a feed is seen, and mark it as seen anyway.
+
+        :return: if the feed has been seen before.
+        """
+        key = (uin, abstime)
+        seen = key in self
+        if seen:
+            self._data.move_to_end(key)
+        else:
+            self.add(key)
+        return seen
+
+    def _keep(self, value: float) -> bool:
+        # expired entries are skipped
+        return self.ttl is None or time.time() - value <= self.ttl
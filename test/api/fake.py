@@ -0,0 +1,87 @@
+"""Build fake feed pages without network."""
+
+import typing as t
+from types import SimpleNamespace
+
+from aioqzone.model import FeedData
+
+
+def fake_raw_feed(
+    uin: int, abstime: int, summary: str = "", hasmore: bool = False, **kwds
+) -> t.Dict[str, t.Any]:
+    """A feed as returned by Qzone, to be validated into :class:`FeedData`."""
+    fid = kwds.pop("fid", f"{uin:x}{abstime:x}")
+    key = f"http://user.qzone.qq.com/{uin}/mood/{fid}"
+    return dict(
+        comm=dict(
+            time=abstime,
+            appid=kwds.pop("appid", 311),
+            feedstype=kwds.pop("typeid", 0),
+            curlikekey=key,
+            orglikekey=key,
+            ugckey=f"{uin}_311_{fid}",
+            ugcrightkey=fid,
+            right_info={},
+            wup_feeds_type=0,
+        ),
+        id=dict(cellid=fid),
+        userinfo=dict(uin=uin, nickname=kwds.pop("nickname", str(uin))),
+        summary=dict(summary=summary, hasmore=hasmore),
+        **kwds,
+    )
+
+
+def fake_feed(
+    uin: int, abstime: int, summary: str = "", hasmore: bool = False, **kwds
+) -> FeedData:
+    return FeedData.model_validate(fake_raw_feed(uin, abstime, summary, hasmore, **kwds))
+
+
+def fake_pic(raw: str, thumb: str) -> dict:
+    """A raw ``pic`` field with one photo, to be passed to :func:`fake_feed`."""
+    urls = {
+        str(i): dict(height=h, width=h, url=u)
+        for i, (h, u) in enumerate([(100, raw), (10, thumb)])
+    }
+    video = dict(videoid="", videourl="", coverurl={}, videotime=0)
+    return dict(
+        albumid="",
+        uin=0,
+        picdata=[
+            dict(
+                photourl=urls,
+                videodata=video,
+                albumid="",
+                curlikekey="",
+                origin_size=0,
+                origin_height=100,
+                origin_width=100,
+            )
+        ],
+    )
+
+
+def fake_pages(feeds: t.List[FeedData], page_size: int = 5) -> t.List[SimpleNamespace]:
+    """Split feeds into pages with the same attributes as :class:`FeedPageResp`."""
+    pages = []
+    for i in range(0, len(feeds), page_size):
+        pages.append(
+            SimpleNamespace(
+                vFeeds=feeds[i : i + page_size],
+                attachinfo=str(i + page_size),
+                hasmore=i + page_size < len(feeds),
+            )
+        )
+    return pages
+
+
+def page_server(pages: t.List[SimpleNamespace], log: t.Optional[list] = None):
+    """Return an async function to be patched as ``get_feedpage_by_uin``."""
+
+    async def get_feedpage_by_uin(uin=None, attach_info=None):
+        idx = int(attach_info or 0) // len(pages[0].vFeeds)
+        if log is not None:
+            log.append(attach_info or "")
+        return pages[idx]
+
+    return get_feedpage_by_uin
@@ -1,12 +1,35 @@
 import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
+from unittest.mock import patch
 
 import pytest
 import pytest_asyncio
+from aiohttp import web
 from aioqzone.api import Loginable
+from aioqzone.exception import QzoneError
+from aioqzone.model import EmEntity, FeedData, TextEntity
 from qqqr.utils.net import ClientAdapter
 from tenacity import RetryError
 
 from aioqzone_feed.api import FeedApi
+from aioqzone_feed.store import CrawlCursor, FeedStore
+from aioqzone_feed.type import BaseFeed, FeedContent
+from aioqzone_feed.utils import (
+    BoundedExecutor,
+    DropRules,
+    EmojiTranslator,
+    FingerprintIndex,
+    MappingSource,
+    MediaCache,
+    Metrics,
+    SeenCache,
+    TTLCache,
+    statsd_sink,
+)
+
+from .fake import fake_feed, fake_pages, fake_pic, fake_raw_feed, page_server
 
 pytestmark = pytest.mark.asyncio
 
@@ -48,3 +71,625 @@ async def test_by_second(api: FeedApi):
     await api.wait()
     assert len(set(batch)) == len(batch)
     assert len(set(batch)) == n - len(drop)
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+async def test_prefetch(api: FeedApi, prefetch: int):
+    feeds = [fake_feed(i, 1000 - i) for i in range(30)]
+    requested = []
+    batch = []
+    api.prefetch = prefetch
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds), requested)):
+        n = await api.get_feeds_by_second(12, start=1000)
+        await api.wait()
+
+    assert n == len(batch) == 13
+    assert all(feed.abstime >= 1000 - 12 for feed in batch)
+    # pages fetched ahead of the stop page are bounded by prefetch depth
+    assert len(requested) <= 3 + prefetch
+
+
+async def test_seen_cache(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i) for i in range(10)]
+    batch = []
+    skipped = []
+    api.seen_cache = SeenCache(maxsize=8)
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+    api.feed_skipped.add_impl(lambda bid, feed: skipped.append(feed))
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        assert await api.get_feeds_by_count(5) == 5
+        assert await api.get_feeds_by_count(10) == 10
+        await api.wait()
+
+    assert len(batch) == 10
+    assert len(skipped) == 5
+    assert len(api.seen_cache) == 8
+
+
+async def test_incremental(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i) for i in range(30)]
+    requested = []
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds), requested)):
+        assert await api.get_feeds_incremental(0) == 0
+        assert not requested
+        assert await api.get_feeds_incremental(3) == 3
+    assert api.watermarks[0] == (1000, 0)
+
+    feeds[:0] = [fake_feed(i, 1000 + i) for i in range(7, 0, -1)]
+    requested.clear()
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds), requested)):
+        assert await api.get_feeds_incremental(7) == 7
+    assert api.watermarks[0] == (1007, 7)
+    assert len(requested) == 2
+
+    # a stale mark: the walk is bounded by hint + slack
+    feeds[:0] = [fake_feed(i, 2000 - i) for i in range(100)]
+    requested.clear()
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds), requested)):
+        assert await api.get_feeds_incremental(3, slack=4) == 7
+    assert api.watermarks[0] == (2000, 0)
+    assert len(requested) == 2
+
+
+async def test_expand_executor(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i, "short", hasmore=True) for i in range(10)]
+    batch = []
+    failed = []
+    inflight = []
+    api.expand_executor = BoundedExecutor(max_inflight=2)
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+    api.feed_expand_failed.add_impl(lambda bid, feed, exc: failed.append(feed))
+
+    async def shuoshuo(fid, uin, appid=311):
+        inflight.append(api.expand_executor.inflight)
+        await asyncio.sleep(0.01)
+        if uin == 0:
+            raise RuntimeError
+        return fake_feed(uin, 1000 - uin, "full")
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        with patch.object(api, "shuoshuo", shuoshuo):
+            assert await api.get_feeds_by_count(10) == 10
+            await api.wait()
+
+    assert max(inflight) <= 2
+    assert len(failed) == 1
+    assert sorted(i.entities[0].con for i in batch) == ["full"] * 9 + ["short"]
+
+
+async def test_iter_feeds(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i) for i in range(30)]
+    requested = []
+    processed = []
+    api.feed_processed.add_impl(lambda bid, feed: processed.append(feed))
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds), requested)):
+        it = api.iter_feeds_by_second(30, start=1000, buffer=5)
+        got = [await it.__anext__() for _ in range(3)]
+        await asyncio.sleep(0.01)
+        # fetching is paused since the consumer is slow
+        assert len(requested) <= 2
+        tasks = asyncio.all_tasks()
+        await it.aclose()
+        # the crawl is stopped once closed
+        assert all(t.done() for t in tasks - {asyncio.current_task()})
+
+        got += [feed async for feed in api.iter_feeds_by_second(30, start=1000)]
+
+    assert [i.abstime for i in got[:3]] == [1000, 999, 998]
+    assert len(got) == 33
+    assert not processed
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+async def test_iter_feeds_limiter(api: FeedApi, ordered: bool):
+    feeds = [fake_feed(i, 1000 - i) for i in range(30)]
+    entered = []
+
+    class Limiter:
+        async def __aenter__(self):
+            entered.append(1)
+
+        async def __aexit__(self, *exc):
+            pass
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        it = api._iter_feeds_by_pred(lambda _, cnt: cnt >= 30, ordered=ordered, limiter=Limiter())
+        assert len([feed async for feed in it]) == 30
+    assert len(entered) == 6
+
+
+async def test_stop_fetch_page(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i) for i in range(30)]
+    calls = []
+
+    async def seen_before(feeds):
+        calls.append(len(feeds))
+        return next((i for i, fd in enumerate(feeds) if fd.abstime <= 988), None)
+
+    api.stop_fetch_page.add_impl(seen_before)
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        assert await api.get_feeds_by_second(100, start=1000) == 12
+    assert calls == [5, 5, 5]
+
+
+async def test_lazy_detail(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i, f"[em]e{i}[/em]") for i in range(5)]
+    batch = []
+    api.lazy_detail = True
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        assert await api.get_feeds_by_count(5) == 5
+        await api.wait()
+
+    assert not any(feed.materialized for feed in batch)
+    assert batch[1].entities[0].eid == 1
+    assert batch[1].materialized and not batch[2].materialized
+
+
+async def test_store_resume(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i, f"#{i}") for i in range(30)]
+    api.store = FeedStore(batch_size=4)
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        assert await api.get_feeds_incremental(3) == 3
+    requested = []
+
+    feeds[:0] = [fake_feed(i, 1000 + i) for i in range(12, 0, -1)]
+    server = page_server(fake_pages(feeds), requested)
+
+    async def broken(uin=None, attach_info=None):
+        if attach_info == "10":
+            raise RuntimeError
+        return await server(uin, attach_info)
+
+    with patch.object(api, "get_feedpage_by_uin", broken):
+        with pytest.raises(RuntimeError):
+            await api.get_feeds_incremental(12)
+    assert api.store.load_state(api.login.uin).attach_info == "10"
+
+    # a new process resumes from the saved state
+    api.watermarks.clear()
+    with patch.object(api, "get_feedpage_by_uin", server):
+        assert await api.get_feeds_incremental(12) == 2
+    assert requested == ["", "5", "10"]
+    assert api.watermarks[0] == (1012, 12)
+    assert len(api.store.query(since=1001)) == 12
+    assert api.store.get(1, 999).entities[0].con == "#1"
+
+
+async def test_detail_cache(api: FeedApi):
+    feeds = [fake_feed(i % 3, 1000 - i, "short", hasmore=True, fid=f"f{i % 3}") for i in range(9)]
+    batch = []
+    calls = []
+    api.detail_cache = TTLCache(maxsize=8, ttl=60)
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+
+    async def shuoshuo(fid, uin, appid=311):
+        calls.append(fid)
+        await asyncio.sleep(0.01)
+        return fake_feed(uin, 1000 - uin, "full")
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        with patch.object(api, "shuoshuo", shuoshuo):
+            await api.get_feeds_by_count(9)
+            await api.wait()
+            await api.get_feeds_by_count(9)
+            await api.wait()
+
+    assert sorted(calls) == ["f0", "f1", "f2"]
+    assert len(batch) == 18
+    assert api.detail_cache.stats["coalesced"] == 6
+    assert api.detail_cache.stats["hits"] == 9
+
+
+async def test_metrics(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i, "short", hasmore=i < 2) for i in range(10)]
+    lines = []
+    api.metrics = Metrics(sink=statsd_sink(lines.append))
+    api.feed_processed.add_impl(lambda bid, feed: None)
+
+    async def shuoshuo(fid, uin, appid=311):
+        return fake_feed(uin, 1000 - uin, "full")
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        with patch.object(api, "shuoshuo", shuoshuo):
+            await api.get_feeds_by_count(10)
+            await api.wait()
+
+    snapshot = api.metrics.snapshot()
+    assert snapshot["counters"]["pages"] == 2
+    assert snapshot["counters"]["processed"] == 10
+    assert snapshot["histograms"]["expand"]["count"] == 2
+    assert snapshot["histograms"]["handler"]["count"] == 10
+    assert "dispatch_depth" in snapshot["gauges"]
+    assert "aioqzone_feed_page_fetch_seconds_count 2" in api.metrics.prometheus()
+    assert "aioqzone_feed.processed:1|c" in lines
+
+
+async def test_iter_feeds_by_uins(api: FeedApi):
+    now = 10000
+    feeds = {uin: [fake_feed(uin, now - uin - 10 * i) for i in range(12)] for uin in (1, 2, 3)}
+    # the expanded feed should not break the order of its profile
+    feeds[2][1] = fake_feed(2, now - 12, "short", hasmore=True)
+    servers = {uin: page_server(fake_pages(f)) for uin, f in feeds.items()}
+    running = []
+    peak = []
+
+    async def get_feedpage_by_uin(uin=None, attach_info=None):
+        running.append(uin)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(uin)
+        return await servers[uin](uin, attach_info)
+
+    async def shuoshuo(fid, uin, appid=311):
+        await asyncio.sleep(0.05)
+        return fake_feed(uin, now - 12, "full")
+
+    with patch.object(api, "get_feedpage_by_uin", get_feedpage_by_uin):
+        with patch.object(api, "shuoshuo", shuoshuo):
+            got = [
+                feed
+                async for feed in api.iter_feeds_by_uins(
+                    [1, 2, 3], {1: 60, 2: 100, 3: 1000}, start=now, concurrency=2
+                )
+            ]
+
+    assert max(peak) <= 2
+    assert [f.abstime for f in got] == sorted((f.abstime for f in got), reverse=True)
+    assert sum(f.uin == 1 for f in got) == 6
+    assert sum(f.uin == 3 for f in got) == 12
+    assert any(f.uin == 2 and f.entities and f.entities[0].con == "full" for f in got)
+
+
+async def test_iter_feeds_by_uins_failed(api: FeedApi):
+    now = 10000
+    servers = {
+        uin: page_server(fake_pages([fake_feed(uin, now - uin - 10 * i) for i in range(12)]))
+        for uin in (1, 3)
+    }
+    failed = []
+    api.feed_crawl_failed.add_impl(lambda uin, exc: failed.append((uin, exc)))
+
+    async def get_feedpage_by_uin(uin=None, attach_info=None):
+        if uin == 2:
+            raise QzoneError(-10031)
+        return await servers[uin](uin, attach_info)
+
+    with patch.object(api, "get_feedpage_by_uin", get_feedpage_by_uin):
+        got = [
+            feed
+            async for feed in api.iter_feeds_by_uins(
+                [1, 2, 3, 4], {1: 1000, 2: 1000, 3: 1000}, start=now
+            )
+        ]
+    await api.ch_feed_notify.wait()
+
+    assert sum(f.uin == 1 for f in got) == 12
+    assert sum(f.uin == 3 for f in got) == 12
+    assert [uin for uin, _ in failed] == [2]
+    assert isinstance(failed[0][1], QzoneError)
+
+
+async def test_drop_rules(api: FeedApi, tmp_path):
+    feeds = [
+        fake_feed(20050606, 1000, "ad", hasmore=True),
+        fake_feed(1, 999, "buy now!"),
+        fake_feed(2, 998, "hello", fid="advertisement_1"),
+        fake_feed(3, 997, "hello"),
+        fake_feed(4, 996, "hello"),
+    ]
+    batch = []
+    drop = []
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+    api.feed_dropped.add_impl(lambda bid, feed: drop.append(feed))
+    api.drop_rules.update(keywords=["buy now"])
+
+    async def shuoshuo(fid, uin, appid=311):
+        raise AssertionError("dropped feeds should not be expanded")
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        with patch.object(api, "shuoshuo", shuoshuo):
+            await api.get_feeds_by_count(10)
+            await api.wait()
+            assert [f.uin for f in batch] == [3, 4]
+            assert all(type(f) is BaseFeed for f in drop)
+            assert len(drop) == 3
+
+            path = tmp_path / "rules.json"
+            path.write_text(json.dumps(dict(uins=[4, 20050606])))
+            api.drop_rules = DropRules.from_file(path)
+            assert not api.drop_rules.reload()
+            batch.clear()
+            await api.get_feeds_by_count(10)
+            await api.wait()
+            assert [f.uin for f in batch] == [1, 2, 3]
+
+
+async def test_media_cache(api: FeedApi, tmp_path):
+    async def photo(request: web.Request):
+        return web.Response(body=b"photo " + request.match_info["name"].encode())
+
+    app = web.Application()
+    app.router.add_get("/{name}", photo)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    feeds = [
+        fake_feed(i, 1000 - i, pic=fake_pic(f"{base}/a{i}", f"{base}/t{i}")) for i in range(4)
+    ]
+    feeds.append(fake_feed(9, 900))
+    processed = []
+    updated = []
+    api.media_cache = MediaCache(tmp_path, max_bytes=20)
+    api.store = FeedStore()
+    api.feed_processed.add_impl(lambda bid, feed: processed.append(feed))
+    api.feed_media_updated.add_impl(lambda bid, feed: updated.append(feed))
+
+    try:
+        with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+            await api.get_feeds_by_count(5)
+            await api.wait()
+            await api.wait_media()
+    finally:
+        await runner.cleanup()
+
+    # delivered feeds are not changed
+    assert all(f.media[0].raw.startswith(base) for f in processed if f.media)
+    assert len(updated) == 4
+    assert all(f.media[0].raw.startswith("file://") for f in updated)
+    assert all(f not in processed for f in updated)
+    assert all(hash(f) == hash(replace(f)) for f in updated)
+    # each photo is 8 bytes, older ones are evicted
+    assert len(api.media_cache) == 2
+    assert api.media_cache.total == 16
+    assert (tmp_path / MediaCache.INDEX).exists()
+
+    # the store keeps remote urls, which are resolved when read
+    stored = [api.store.get(f.uin, f.abstime) for f in updated]
+    assert all(f and f.media[0].raw.startswith(base) for f in stored)
+    local = [api.media_cache.localize(f.media[0]) for f in stored if f]
+    assert sum(m.raw.startswith("file://") for m in local) == 2
+
+
+async def test_fingerprints(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i, f"hello {i}") for i in range(5)]
+    batch = []
+    edited = []
+    api.fingerprints = FingerprintIndex()
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+    api.feed_edited.add_impl(lambda bid, feed, old: edited.append((feed, old)))
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        await api.get_feeds_by_count(5)
+        await api.wait()
+    fps = {f.uin: f.fingerprint for f in batch}
+    assert len(batch) == 5 and len(set(fps.values())) == 5
+
+    feeds[2] = fake_feed(2, 998, "hello 2 (edited)")
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        await api.get_feeds_by_count(5)
+        await api.wait()
+    assert len(batch) == 5
+    assert len(edited) == 1
+    feed, old = edited[0]
+    assert feed.uin == 2 and old == fps[2] != feed.fingerprint
+
+
+@pytest.mark.parametrize("pool", ["thread", "process"])
+async def test_parse_executor(api: FeedApi, pool: str):
+    raws = [fake_raw_feed(i, 1000 - i, f"hello {i}") for i in range(15)]
+    pages = fake_pages([FeedData.model_validate(r) for r in raws])
+    bodies = []
+
+    async def call(api_):
+        offset = int(api_.params.attach_info)
+        chunk = raws[offset : offset + 5]
+        data = dict(hasmore=offset + 5 < len(raws), attachinfo=str(offset + 5))
+        bodies.append(offset)
+        body = dict(code=0, data=dict(newcnt=0, undeal_info={}, vFeeds=chunk, **data))
+        return json.dumps(body).encode()
+
+    batch = []
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+    api.qzone_tokens[api.login.uin] = "token"
+    with (ThreadPoolExecutor if pool == "thread" else ProcessPoolExecutor)(1) as executor:
+        api.parse_executor = executor
+        with patch.object(api, "get_feedpage_by_uin", page_server(pages)), patch.object(
+            api, "call", call
+        ):
+            n = await api.get_feeds_by_second(12, start=1000)
+            await api.wait()
+
+    assert bodies == [5, 10]
+    assert n == len(batch) == 13
+    assert sorted(f.entities[0].con for f in batch) == sorted(f"hello {i}" for i in range(13))
+
+
+async def test_processed_batch(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i, hasmore=i == 3) for i in range(12)]
+    batches = []
+    api.processed_batcher.max_size = 4
+    api.feed_processed_batch.add_impl(lambda bid, feeds: batches.append(feeds))
+
+    async def shuoshuo(fid, uin, appid):
+        await asyncio.sleep(0.01)
+        return fake_feed(uin, 1000 - uin)
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))), patch.object(
+        api, "shuoshuo", shuoshuo
+    ):
+        n = await api.get_feeds_by_second(12, start=1000)
+        await api.wait()
+
+    assert n == 12
+    assert sorted(f.uin for b in batches for f in b) == list(range(12))
+    # full batches of 4, the rest of each page of 5, and the expanded one at last
+    assert [len(b) for b in batches] == [4, 4, 1, 2, 1]
+    assert batches[-1][0].uin == 3
+
+
+async def test_backpressure(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i) for i in range(30)]
+    batch = []
+
+    async def slow_handler(bid, feed):
+        await asyncio.sleep(0.002)
+        batch.append(feed)
+
+    api.backpressure = (6, 2)
+    api.feed_processed.add_impl(slow_handler)
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        n = await api.get_feeds_by_second(30, start=1000)
+        await api.wait()
+
+    assert n == len(batch) == 30
+    # pending tasks exceed the high mark by at most one page
+    assert 6 < api.peak_pending <= 6 + 5
+
+
+async def test_page_cache(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i) for i in range(15)]
+    requested = []
+    serve = page_server(fake_pages(feeds), requested)
+
+    async def slow_serve(uin=None, attach_info=None):
+        await asyncio.sleep(0.01)
+        return await serve(uin, attach_info)
+
+    batch = []
+    api.page_cache = TTLCache(ttl=5)
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+    with patch.object(api, "get_feedpage_by_uin", slow_serve):
+        n = await asyncio.gather(
+            api.get_feeds_by_count(10), api.get_feeds_by_second(7, start=1000)
+        )
+        await api.wait()
+
+    assert requested == ["", "5", "10"]
+    assert n == [10, 8] and len(batch) == 18
+    assert api.page_cache.stats["coalesced"] == 2
+
+
+async def test_page_cache_copy(api: FeedApi):
+    fd = FeedData.model_validate(
+        fake_raw_feed(1, 1000, "[em]e100[/em]", original=fake_raw_feed(2, 900, "[em]e100[/em]"))
+    )
+    model = FeedContent.from_feed(fd)
+    model.set_detail(fd)
+    page = fake_pages([fd])[0]
+
+    async def fetch(uin, attach_info, limiter=None):
+        return page, [model]
+
+    api.page_cache = TTLCache(ttl=5)
+    with patch.object(api, "_fetch_page_uncached", fetch):
+        _, first = await api._fetch_page(None, "5")
+        _, second = await api._fetch_page(None, "5")
+
+    assert first and second and first[0] is not second[0]
+    first[0].translate(EmojiTranslator(MappingSource({100: "x"})))
+    # other callers of the cached page are not affected
+    assert second[0].entities == second[0].forward.entities == [EmEntity(eid=100)]
+    assert model.forward.entities == [EmEntity(eid=100)]
+    assert first[0].forward.entities != [EmEntity(eid=100)]
+
+
+async def test_crawl_cursor(api: FeedApi):
+    feeds = [fake_feed(i, 1000 - i) for i in range(20)]
+    requested = []
+    serve = page_server(fake_pages(feeds), requested)
+    fail = {"10"}
+
+    async def flaky_serve(uin=None, attach_info=None):
+        if attach_info in fail:
+            fail.remove(attach_info)
+            raise RetryError(None)  # type: ignore
+        return await serve(uin, attach_info)
+
+    batch = []
+    cursor = CrawlCursor()
+    api.feed_processed.add_impl(lambda bid, feed: batch.append((bid, feed)))
+    with patch.object(api, "get_feedpage_by_uin", flaky_serve):
+        with pytest.raises(RetryError):
+            await api.get_feeds_by_second(16, start=1000, cursor=cursor)
+        assert cursor.attach_info == "10" and cursor.count == 10 and not cursor.done
+
+        cursor = CrawlCursor.from_dict(cursor.to_dict())
+        new_bid = api.new_batch()
+        # arguments are ignored when resuming
+        n = await api.get_feeds_by_second(1, cursor=cursor)
+        await api.wait()
+
+    assert n == 7 and cursor.done and cursor.count == 17
+    assert requested == ["", "5", "10", "15"]
+    assert [f.uin for _, f in batch] == list(range(17))
+    assert {bid for bid, _ in batch} == {cursor.bid}
+    # the resumed crawl does not take over the batch id of the api
+    assert api.bid == new_bid != cursor.bid
+    assert await api.get_feeds_by_second(16, start=1000, cursor=cursor) == 0
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+async def test_emoji(api: FeedApi, lazy: bool):
+    org = fake_raw_feed(99, 900, "[em]e101[/em]")
+    feeds = [fake_feed(i, 1000 - i, f"{i}[em]e{100 + i % 3}[/em]") for i in range(9)]
+    feeds.append(fake_feed(9, 991, "forward", original=org))
+    batch = []
+    api.lazy_detail = lazy
+    api.emoji = EmojiTranslator(MappingSource({100: "微笑", 101: "大笑"}))
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+
+    with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+        await api.get_feeds_by_second(9, start=1000)
+        await api.wait()
+
+    assert len(batch) == 10
+    # the first page is looked up in one batch, and the second one hits the cache
+    assert api.emoji.lookups == 1 and api.emoji.misses == 3
+    for feed in batch[:9]:
+        e = feed.entities[1]
+        if feed.uin % 3 == 2:
+            assert e == EmEntity(eid=102)
+        else:
+            assert isinstance(e, TextEntity) and e.con == ["[/微笑]", "[/大笑]"][feed.uin % 3]
+    assert batch[9].forward.entities == [TextEntity(con="[/大笑]")]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+async def test_emoji_fingerprint(api: FeedApi, lazy: bool):
+    class FlakySource(MappingSource):
+        def lookup(self, eids):
+            if not self.failed:
+                self.failed = True
+                raise OSError("source unavailable")
+            return super().lookup(eids)
+
+    source = FlakySource({100: "微笑"})
+    source.failed = False
+    feeds = [fake_feed(i, 1000 - i, f"{i}[em]e100[/em]") for i in range(5)]
+    batch = []
+    edited = []
+    api.lazy_detail = lazy
+    api.emoji = EmojiTranslator(source)
+    api.fingerprints = FingerprintIndex()
+    api.feed_processed.add_impl(lambda bid, feed: batch.append(feed))
+    api.feed_edited.add_impl(lambda bid, feed, old: edited.append(feed))
+
+    for _ in range(2):
+        with patch.object(api, "get_feedpage_by_uin", page_server(fake_pages(feeds))):
+            await api.get_feeds_by_count(5)
+            await api.wait()
+
+    # emojis are kept untranslated the first time, but the feeds are not edited
+    assert len(batch) == 5
+    assert not edited
+    assert api.emoji.get(100) == "微笑"
@@ -1,3 +1,5 @@
+import asyncio
+from types import SimpleNamespace
 from typing import Type, cast
 from unittest.mock import patch
 
@@ -5,6 +7,7 @@ import pytest
 import pytest_asyncio
 from aiohttp import ClientResponseError, RequestInfo
 from aioqzone.api import Loginable
+from aioqzone.exception import QzoneError
 from multidict import CIMultiDictProxy
 from qqqr.exception import UserBreak
 from qqqr.utils.net import ClientAdapter
@@ -12,6 +15,7 @@ from tenacity import Future, RetryError
 from yarl import URL
 
 from aioqzone_feed.api import FeedApi
+from aioqzone_feed.api.heartbeat import HeartbeatScheduler, HeartbeatState
 
 pytestmark = pytest.mark.asyncio
 
@@ -45,3 +49,70 @@ async def test_heartbeat_exc(api: FeedApi, exc2r: Type[BaseException]):
         await api.heartbeat_refresh()
         await api.ch_heartbeat_notify.wait()
         assert pool
+
+
+async def test_heartbeat_scheduler(api: FeedApi):
+    sched = HeartbeatScheduler(api, interval=300, min_interval=60, max_interval=1200, jitter=0)
+    # the first result only seeds the count
+    assert sched.update(1000, 0.05) == 300
+    assert sched.rate is None
+    # busy: 30 new feeds in 300s, interval shrinks
+    assert sched.update(1030, 300) < 300
+    assert sched.state == HeartbeatState.running
+    # idle: interval grows
+    for _ in range(10):
+        sched.update(1030, sched.interval)
+    assert sched.interval == 1200
+
+    assert sched.update(ClientResponseError(_fake_request, (), status=500), 1) == 1200
+    assert sched.update(ClientResponseError(_fake_request, (), status=500), 1) == 2400
+    assert sched.state == HeartbeatState.backoff
+
+    for _ in range(3):
+        delay = sched.update(QzoneError(-3000), 1)
+    assert sched.state == HeartbeatState.open
+    assert delay == sched.circuit_timeout
+
+
+async def test_heartbeat_stop_inflight(api: FeedApi):
+    calls = []
+    failed = []
+    api.hb_failed.add_impl(lambda exc: failed.append(exc))
+
+    async def slow_count():
+        calls.append(1)
+        await asyncio.sleep(1)
+
+    with patch.object(api, "mfeeds_get_count", side_effect=slow_count):
+        sched = api.start_heartbeat(min_interval=0.01, interval=0.01, max_interval=0.01)
+        await asyncio.sleep(0.05)
+        assert calls == [1]
+        task = sched._task
+        assert task
+
+        api.stop_heartbeat()
+        await asyncio.sleep(0.1)
+        assert task.done()
+        assert calls == [1]
+
+    await api.ch_heartbeat_notify.wait()
+    assert not failed
+    assert api.hb_state == HeartbeatState.stopped
+
+
+async def test_heartbeat_first_sample(api: FeedApi):
+    counts = iter([100, 100, 100])
+
+    async def count():
+        return SimpleNamespace(active_cnt=next(counts))
+
+    with patch.object(api, "mfeeds_get_count", side_effect=count):
+        sched = api.start_heartbeat(interval=0.05, min_interval=0.01, max_interval=1, jitter=0)
+        await asyncio.sleep(0.02)
+        # the backlog of active_cnt is not taken as new feeds
+        assert sched.rate is None
+        assert sched.interval == 0.05
+        sched._task.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+    assert sched.state == HeartbeatState.stopped
@@ -0,0 +1,97 @@
+import asyncio
+from collections import Counter
+from unittest.mock import patch
+
+import pytest
+from aioqzone.api import UpLoginConfig, UpLoginManager
+from aioqzone.api.h5 import QzoneH5API
+from qqqr.utils.net import ClientAdapter
+
+from aioqzone_feed.api.pool import FeedApiPool
+
+from .fake import fake_feed, fake_pages, page_server
+
+pytestmark = pytest.mark.asyncio
+
+
+def fake_man(client: ClientAdapter, uin: int):
+    return UpLoginManager(client, UpLoginConfig(uin=uin, pwd=""))
+
+
+async def test_pool_limits(client: ClientAdapter):
+    pool = FeedApiPool(client, max_concurrency=3, per_account=2)
+    for uin in range(1, 4):
+        pool.add(fake_man(client, uin))
+
+    inflight = Counter()
+    peaks = Counter()
+
+    async def call(self: QzoneH5API, api):
+        inflight[self.login.uin] += 1
+        inflight[0] += 1
+        peaks[self.login.uin] = max(peaks[self.login.uin], inflight[self.login.uin])
+        peaks[0] = max(peaks[0], inflight[0])
+        await asyncio.sleep(0.01)
+        inflight[self.login.uin] -= 1
+        inflight[0] -= 1
+
+    with patch.object(QzoneH5API, "call", call):
+        await asyncio.gather(
+            *(api.mfeeds_get_count() for api in pool.apis.values() for _ in range(4))
+        )
+        # a single account is limited by per_account
+        await asyncio.gather(*(pool.apis[1].mfeeds_get_count() for _ in range(4)))
+
+    assert peaks[0] == 3
+    assert all(peaks[uin] <= 2 for uin in pool.apis)
+    assert peaks[1] == 2
+    pool.stop()
+
+
+async def test_pool_tagged(client: ClientAdapter):
+    pool = FeedApiPool(client)
+    feeds = [fake_feed(i, 1000 - i) for i in range(10)]
+    got = []
+    pool.feed_processed.add_impl(lambda uin, bid, feed: got.append(uin))
+
+    for uin in (1, 2):
+        api = pool.add(fake_man(client, uin))
+        api.get_feedpage_by_uin = page_server(fake_pages(feeds))
+
+    await pool.apis[1].get_feeds_by_count(3)
+    await pool.apis[2].get_feeds_by_count(5)
+    await pool.wait()
+    assert sorted(got) == [1] * 3 + [2] * 5
+
+    api = pool.remove(1)
+    assert len(pool) == 1
+    got.clear()
+    await api.get_feeds_by_count(3)
+    await api.wait()
+    assert not got
+    pool.stop()
+
+
+async def test_pool_heartbeat(client: ClientAdapter):
+    pool = FeedApiPool(client, hb_interval=0.3)
+    sent = []
+    for uin in range(1, 4):
+        api = pool.add(fake_man(client, uin))
+
+        async def refresh(uin=uin):
+            sent.append((uin, asyncio.get_event_loop().time()))
+            return 0
+
+        api.heartbeat_refresh = refresh
+
+    start = asyncio.get_event_loop().time()
+    pool.start_heartbeat()
+    await asyncio.sleep(0.25)
+    pool.stop_heartbeat()
+    await pool.ch_heartbeat.wait()
+
+    # one heartbeat per 0.1s, one account at a time
+    assert [uin for uin, _ in sent] == [1, 2]
+    assert sent[0][1] - start >= 0.09
+    assert sent[1][1] - sent[0][1] >= 0.09
+    pool.stop()
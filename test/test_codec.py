@@ -0,0 +1,65 @@
+import pickle
+
+import pytest
+from aioqzone.model import AtEntity, EmEntity, LinkEntity, TextEntity
+
+from aioqzone_feed.codec import BatchView, decode, decode_batch, encode, encode_batch
+from aioqzone_feed.type import BaseFeed, FeedContent, VisualMedia
+
+
+def make_feed(i: int) -> FeedContent:
+    forward = FeedContent(
+        appid=311,
+        typeid=0,
+        fid=f"fwd{i}",
+        abstime=900 + i,
+        uin=2,
+        nickname="转发",
+        entities=[TextEntity(con="original")],
+        media=[VisualMedia(1, 2, "http://raw", True, None)],
+    )
+    return FeedContent(
+        appid=311,
+        typeid=0,
+        fid=f"{i:024x}",
+        abstime=1000 + i,
+        uin=1 + i,
+        nickname="昵称",
+        curkey=f"http://user.qzone.qq.com/{i}",
+        islike=bool(i % 2),
+        entities=[
+            TextEntity(con="hello "),
+            AtEntity(uin=3, nick="at"),
+            EmEntity(eid=100),
+            LinkEntity(url="https://example.com/", text="link"),
+        ],
+        forward=forward if i % 2 else "http://share",
+        media=[VisualMedia(100, 200, "http://a", False, "http://t")],
+    )
+
+
+def test_roundtrip():
+    feeds = [make_feed(i) for i in range(4)]
+    feeds.append(BaseFeed(appid=202, typeid=1, fid="x", abstime=1, uin=5, nickname="base"))
+    buf = encode_batch(feeds)
+    assert decode_batch(buf) == feeds
+    assert decode(encode(feeds[1])) == feeds[1]
+    assert decode(encode(feeds[1])).fingerprint == feeds[1].fingerprint
+    assert len(buf) < len(pickle.dumps(feeds))
+
+
+def test_view():
+    feeds = [make_feed(i) for i in range(3)]
+    view = BatchView(encode_batch(feeds))
+    assert len(view) == 3
+    assert [v.uin for v in view] == [1, 2, 3]
+    assert view[-1].fid == feeds[-1].fid
+    assert view[1].curkey == feeds[1].curkey and view[1].unikey is None
+    assert view[1].to_feed() == feeds[1]
+
+
+def test_version():
+    buf = bytearray(encode_batch([]))
+    buf[3] = 99
+    with pytest.raises(ValueError):
+        BatchView(buf)
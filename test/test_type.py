@@ -0,0 +1,122 @@
+import copy
+import pickle
+import weakref
+
+import pytest
+from aioqzone.model import EmEntity, TextEntity
+
+from aioqzone_feed.codec import decode, encode
+from aioqzone_feed.store import FeedStore
+from aioqzone_feed.type import BaseDetail, BaseFeed, FeedContent, VisualMedia
+from aioqzone_feed.utils import EmojiTranslator, MappingSource
+
+from api.fake import fake_feed, fake_raw_feed
+
+
+def make_feed(abstime: int, uin: int = 1, con: str = "hello") -> FeedContent:
+    return FeedContent(
+        appid=311,
+        typeid=0,
+        fid="f",
+        abstime=abstime,
+        uin=uin,
+        nickname="昵称",
+        entities=[TextEntity(con=con)],
+        forward="http://share",
+        media=[VisualMedia(100, 200, "http://a", False, "http://t")],
+    )
+
+
+def test_slots():
+    feed = make_feed(1000)
+    assert not hasattr(feed, "__dict__")
+    with pytest.raises(AttributeError):
+        feed.foo = 1  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        BaseFeed(311, 0, "f", 1000, 1, "昵称"),
+        BaseDetail(entities=[TextEntity(con="hello")]),
+        VisualMedia(100, 200, "http://a", False),
+        make_feed(1000),
+    ],
+)
+def test_weakref_pickle_copy(obj):
+    assert weakref.ref(obj)() is obj
+    assert pickle.loads(pickle.dumps(obj)) == obj
+    assert copy.copy(obj) == obj
+    assert copy.deepcopy(obj) == obj
+
+
+def test_base_detail():
+    detail = BaseDetail()
+    assert isinstance(detail, BaseDetail)
+    assert detail.entities == [] and detail.forward is None and detail.media == []
+    assert BaseDetail() == detail
+
+
+def test_eq_hash_order():
+    a, b = make_feed(1000), make_feed(1000)
+    assert a == b and hash(a) == hash(b)
+    assert len({a, b}) == 1
+
+    c = make_feed(1000, con="edited")
+    assert a != c and a.fingerprint != c.fingerprint
+
+    # hash agrees with eq even if the content is changed after the fingerprint is cached
+    a.fingerprint
+    a.entities = c.entities
+    assert a == c and hash(a) == hash(c)
+    a.entities = b.entities
+
+    older, newer = make_feed(999, uin=2), make_feed(1000)
+    assert older < newer and older <= newer and not newer < older
+    assert sorted([newer, c, older]) == [older, newer, c]
+
+    dup = pickle.loads(pickle.dumps(a))
+    assert hash(dup) == hash(a)
+    assert dup.fingerprint == a.fingerprint
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_translate_cold(lazy: bool):
+    fd = fake_feed(1, 1000, "hi[em]e100[/em]")
+    plain = FeedContent.from_feed(fd)
+    plain.set_detail(fd)
+
+    # an empty translator is falsy, but should be used anyway
+    translate = EmojiTranslator(MappingSource({100: "x"}))
+    assert not translate
+    feed = FeedContent.from_feed(fd)
+    feed.set_detail(fd, lazy=lazy, translate=translate)
+    assert feed.entities == [TextEntity(con="hi"), TextEntity(con="[/x]")]
+    assert plain.entities[1] == EmEntity(eid=100)
+    assert feed.fingerprint == plain.fingerprint
+
+
+def _store_roundtrip(feed: FeedContent) -> FeedContent:
+    store = FeedStore()
+    store.add(feed)
+    r = store.get(feed.uin, feed.abstime)
+    assert r
+    return r
+
+
+@pytest.mark.parametrize("roundtrip", [lambda f: decode(encode(f)), _store_roundtrip])
+def test_fingerprint_roundtrip(roundtrip):
+    org = fake_raw_feed(2, 900, "org[em]e100[/em]")
+    fd = fake_feed(1, 1000, "hi[em]e100[/em]", original=org)
+    plain = FeedContent.from_feed(fd)
+    plain.set_detail(fd)
+    feed = FeedContent.from_feed(fd)
+    feed.set_detail(fd, translate=EmojiTranslator(MappingSource({100: "x"})))
+
+    r = roundtrip(feed)
+    assert r == feed and hash(r) == hash(feed)
+    assert r.fingerprint == feed.fingerprint == plain.fingerprint
+    assert isinstance(r.forward, FeedContent)
+    assert r.forward.fingerprint == plain.forward.fingerprint
+    # not computed, so it is computed from the content
+    assert roundtrip(plain).fingerprint == plain.fingerprint